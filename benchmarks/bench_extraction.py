@@ -0,0 +1,96 @@
+"""
+Micro-benchmark of the guidebook key extraction.
+
+Compares the compiled prefix-trie engine (CompiledJsonPaths) against the
+previous implementation, which re-split every path with get_jsonpath /
+pop_jsonpath and matched keys by substring.
+
+    python benchmarks/bench_extraction.py [--assets 2000] [--keys 8] [--repeat 5]
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "guidebook"))
+
+from main import CompiledJsonPaths, NameJsonPath, get_jsonpath  # noqa: E402
+from reticulator import JsonFileResource  # noqa: E402
+
+
+# --- Previous implementation, kept here as the baseline ---
+
+def legacy_get_json_value(asset, path, should_pop):
+    try:
+        if should_pop:
+            return asset.pop_jsonpath(path)
+        else:
+            return get_jsonpath(asset.data, path)
+    except Exception:
+        return None
+
+def legacy_assign_translation_value(path, value, translation_dict, key_list):
+    for key in key_list:
+        if key in path:
+            translation_dict[key] = value
+
+def legacy_process_asset(asset, jsonpaths_list, key_list):
+    translation_data = {}
+    for jsonpaths in jsonpaths_list:
+        for jp in jsonpaths:
+            value = legacy_get_json_value(asset, jp.path, jp.should_pop)
+            if value is not None:
+                legacy_assign_translation_value(jp.path, value, translation_data, key_list)
+    return translation_data
+
+
+def make_asset_data(index, key_list):
+    description = {"identifier": f"bench:item_{index}"}
+    # Only every other key is present, like real packs
+    for k_idx, key in enumerate(key_list):
+        if (index + k_idx) % 2 == 0:
+            description[key] = f"{key} value {index}"
+    return {
+        "format_version": "1.20.0",
+        "minecraft:item": {"description": description, "components": {"minecraft:max_stack_size": 64}},
+    }
+
+def time_run(datasets, run):
+    assets = [JsonFileResource(data=copy.deepcopy(data)) for data in datasets]
+    start = time.perf_counter()
+    for asset in assets:
+        run(asset)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=2000)
+    parser.add_argument("--keys", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    key_list = [f"key_{i}" for i in range(args.keys)]
+    jsonpaths_list = [[NameJsonPath(f"minecraft:item/description/{key}", True, False) for key in key_list]]
+    datasets = [make_asset_data(i, key_list) for i in range(args.assets)]
+
+    compiled = CompiledJsonPaths(jsonpaths_list)
+
+    legacy_times = [
+        time_run(datasets, lambda asset: legacy_process_asset(asset, jsonpaths_list, key_list))
+        for _ in range(args.repeat)
+    ]
+    compiled_times = [
+        time_run(datasets, compiled.extract)
+        for _ in range(args.repeat)
+    ]
+
+    legacy_best = min(legacy_times)
+    compiled_best = min(compiled_times)
+    print(f"assets={args.assets} keys={args.keys} repeat={args.repeat}")
+    print(f"legacy   best {legacy_best * 1000:.2f} ms ({legacy_best / args.assets * 1e6:.2f} us/asset)")
+    print(f"compiled best {compiled_best * 1000:.2f} ms ({compiled_best / args.assets * 1e6:.2f} us/asset)")
+    print(f"speedup  {legacy_best / compiled_best:.1f}x")
+
+if __name__ == "__main__":
+    main()
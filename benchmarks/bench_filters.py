@@ -0,0 +1,259 @@
+"""
+End-to-end benchmark of the three filters on synthetic packs.
+
+For every requested size a fresh Regolith-like tree is generated in a work
+directory (behavior/resource packs, data files, build output and the cached
+guidebook archive), then each filter is run the way Regolith runs it, from
+.regolith/tmp with its settings as the first argument. Wall time is measured
+around the subprocess and the per-phase timings come from the filters' own
+timing reports.
+
+    python benchmarks/bench_filters.py --sizes 1000,10000,50000 --output bench_results
+
+Results are written to <output>.json and <output>.csv. Use --filters-root to
+benchmark another checkout of the filters and compare the two result files.
+Everything runs offline.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PROJECT_NAME = "bench"
+NAMESPACE = "bench"
+KEY_LIST = ["name", "recipe", "key", "pattern"]
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def make_entity(i):
+    return {
+        "format_version": "1.20.0",
+        "minecraft:entity": {
+            "description": {"identifier": f"{NAMESPACE}:entity_{i}", "name": f"Entity {i}", "is_spawnable": True},
+            "components": {"minecraft:health": {"value": 20 + i % 10}, "minecraft:movement": {"value": 0.25}},
+        },
+    }
+
+
+def make_block(i):
+    return {
+        "format_version": "1.20.0",
+        "minecraft:block": {
+            "description": {"identifier": f"{NAMESPACE}:block_{i}", "name": f"Block {i}", "recipe": f"block_{i}_recipe"},
+            "components": {"minecraft:destructible_by_mining": {"seconds_to_destroy": 1}},
+        },
+    }
+
+
+def make_item(i):
+    return {
+        "format_version": "1.20.0",
+        "minecraft:item": {
+            "description": {"identifier": f"{NAMESPACE}:item_{i}", "name": f"Item {i}"},
+            "components": {"minecraft:max_stack_size": 64},
+        },
+    }
+
+
+def make_recipe(i, result):
+    return {
+        "format_version": "1.20.0",
+        "minecraft:recipe_shaped": {
+            "description": {"identifier": f"{NAMESPACE}:{result.split(':')[1]}_recipe"},
+            "tags": ["crafting_table"],
+            "pattern": ["#A#", " # ", "BBB"][: 1 + i % 3],
+            "key": {"#": {"item": "minecraft:stick"}, "A": {"item": f"{NAMESPACE}:item_{i}"}, "B": {"item": "minecraft:stone"}},
+            "result": {"item": result},
+        },
+    }
+
+
+def make_mobs(mobs, attacks):
+    records = []
+    for i in range(mobs):
+        records.append({
+            "name": f"boss_{i}",
+            "attacks": [
+                {
+                    "id": f"attack_{a}",
+                    "attack_type": "courotine" if a % 2 else "basic",
+                    "damage_range": [2 + a, 6 + a],
+                    "cast_duration": 1.5,
+                    "attack_time": 0.5,
+                    "tip_duration": 2,
+                    "tip_message": f"Attack {a}",
+                    "cooldown": 1000,
+                    "radius": 3,
+                    "animation": f"attack_{a}",
+                    "min_activation_range": 0,
+                    "max_activation_range": 6,
+                }
+                for a in range(attacks)
+            ],
+        })
+    return {"advance_mob": records}
+
+
+def write_pack_files(bp_path, rp_path, files, rng):
+    """Write roughly `files` BP assets split evenly between the categories."""
+    per_category = max(1, files // 4)
+    for i in range(per_category):
+        write_json(os.path.join(bp_path, "entities", f"entity_{i}.json"), make_entity(i))
+        write_json(os.path.join(bp_path, "blocks", f"block_{i}.json"), make_block(i))
+        write_json(os.path.join(bp_path, "items", f"item_{i}.json"), make_item(i))
+        # Alternate between recipes for items and for blocks
+        result = f"{NAMESPACE}:item_{i}" if i % 2 else f"{NAMESPACE}:block_{i}"
+        write_json(os.path.join(bp_path, "recipes", f"recipe_{i}.json"), make_recipe(i, result))
+
+    # A handful of resource pack files, including incompressible textures
+    for i in range(max(1, per_category // 10)):
+        write_json(os.path.join(rp_path, "entity", f"entity_{i}.json"), {"format_version": "1.10.0", "minecraft:client_entity": {"description": {"identifier": f"{NAMESPACE}:entity_{i}"}}})
+        texture_path = os.path.join(rp_path, "textures", f"texture_{i}.png")
+        os.makedirs(os.path.dirname(texture_path), exist_ok=True)
+        with open(texture_path, 'wb') as f:
+            f.write(rng.randbytes(2048))
+
+
+def generate_tree(root, files, mobs, attacks, seed=0):
+    """Generate a fresh Regolith-like project tree in root."""
+    shutil.rmtree(root, ignore_errors=True)
+    rng = random.Random(seed)
+    tmp = os.path.join(root, ".regolith", "tmp")
+
+    write_pack_files(os.path.join(tmp, "BP"), os.path.join(tmp, "RP"), files, rng)
+    write_json(os.path.join(tmp, "data", "jsonte", "data_files", "entities.json"), make_mobs(mobs, attacks))
+    write_json(os.path.join(root, "config.json"), {"name": PROJECT_NAME})
+    os.makedirs(os.path.join(root, "packs"), exist_ok=True)
+
+    # Build output packaged by create_test_version
+    shutil.copytree(os.path.join(tmp, "BP"), os.path.join(root, "build", f"{PROJECT_NAME}_BP"))
+    shutil.copytree(os.path.join(tmp, "RP"), os.path.join(root, "build", f"{PROJECT_NAME}_RP"))
+
+
+def refresh_packs(root, files, seed=0):
+    """Regenerate the tmp packs like Regolith does between runs, keeping data/."""
+    tmp = os.path.join(root, ".regolith", "tmp")
+    for pack in ["BP", "RP"]:
+        shutil.rmtree(os.path.join(tmp, pack), ignore_errors=True)
+    write_pack_files(os.path.join(tmp, "BP"), os.path.join(tmp, "RP"), files, random.Random(seed))
+
+
+def run_filter(root, filters_root, filter_name, settings):
+    tmp = os.path.join(root, ".regolith", "tmp")
+    if filter_name == "guidebook":
+        cache_dir = os.path.join(root, ".regolith", "cache", "filters", "guidebook")
+        os.makedirs(cache_dir, exist_ok=True)
+        shutil.copy(os.path.join(filters_root, "guidebook", "guidebook.zip"), cache_dir)
+
+    settings = dict(settings, timing_report=True, log_level="warning")
+    script = os.path.join(os.path.abspath(filters_root), filter_name, "main.py")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, script, json.dumps(settings)],
+        cwd=tmp, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{filter_name} failed with exit code {completed.returncode}:\n{completed.stdout}")
+
+    report_path = os.path.join(tmp, "data", filter_name, "timing_report.json")
+    report = {}
+    if os.path.exists(report_path):
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        os.remove(report_path)
+    return wall, report
+
+
+def benchmark_size(work_dir, filters_root, files, args):
+    root = os.path.join(work_dir, f"size_{files}")
+    rows = []
+    guidebook_settings = {"key_list": KEY_LIST, "short_path": "bench"}
+    for repeat in range(args.repeat):
+        generate_tree(root, files, args.mobs, args.attacks, seed=repeat)
+        runs = [
+            ("guidebook", "cold", guidebook_settings),
+            ("guidebook", "warm", guidebook_settings),
+            ("generate_script", "cold", {"short_path": "bench"}),
+            ("create_test_version", "cold", {}),
+        ]
+        for filter_name, run, settings in runs:
+            if run == "warm":
+                refresh_packs(root, files, seed=repeat)
+            wall, report = run_filter(root, filters_root, filter_name, settings)
+            rows.append({
+                "files": files,
+                "mobs": args.mobs,
+                "attacks": args.attacks,
+                "filter": filter_name,
+                "run": run,
+                "repeat": repeat,
+                "wall_seconds": round(wall, 6),
+                "total_seconds": report.get("total_seconds"),
+                "phases": report.get("phases", {}),
+                "counters": report.get("counters", {}),
+            })
+            print(f"files={files} {filter_name} ({run}, #{repeat}): {wall:.3f}s")
+    if not args.keep:
+        shutil.rmtree(root, ignore_errors=True)
+    return rows
+
+
+def write_results(rows, output):
+    with open(output + ".json", 'w', encoding='utf-8') as f:
+        json.dump({"python": sys.version, "results": rows}, f, indent=2)
+
+    phase_names = sorted({name for row in rows for name in row["phases"]})
+    counter_names = sorted({name for row in rows for name in row["counters"]})
+    fields = ["files", "mobs", "attacks", "filter", "run", "repeat", "wall_seconds", "total_seconds"]
+    with open(output + ".csv", 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields + [f"phase_{name}" for name in phase_names] + [f"count_{name}" for name in counter_names])
+        for row in rows:
+            writer.writerow(
+                [row[field] for field in fields]
+                + [row["phases"].get(name, "") for name in phase_names]
+                + [row["counters"].get(name, "") for name in counter_names]
+            )
+    print(f"Results written to {output}.json and {output}.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000", help="comma separated BP file counts")
+    parser.add_argument("--mobs", type=int, default=100, help="advance_mob entries in entities.json")
+    parser.add_argument("--attacks", type=int, default=4, help="attacks per mob")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="bench_results", help="output path without extension")
+    parser.add_argument("--filters-root", default=REPO_ROOT, help="checkout containing the filters to benchmark")
+    parser.add_argument("--work-dir", default=None, help="where to generate the trees (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated trees")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="regolith_filters_bench_")
+
+    rows = []
+    try:
+        for files in sizes:
+            rows.extend(benchmark_size(work_dir, args.filters_root, files, args))
+    finally:
+        if not args.work_dir and not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    write_results(rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
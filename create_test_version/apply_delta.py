@@ -0,0 +1,83 @@
+"""
+Rebuild a test version from the previous version and its delta.
+
+    python apply_delta.py <previous.mcaddon> <version.mcdelta> [output.mcaddon]
+
+The rebuilt archive is verified against the hashes recorded in the delta
+before it is moved into place. By default it is written next to the
+previous version, under the name of the version the delta was made for.
+"""
+import os
+import sys
+import hashlib
+import json
+
+from main import DELTA_FORMAT, DELTA_INFO_NAME, ArchiveReader, ZipAssembler, create_temp_file, file_sha256
+
+
+def verify_archive(path, delta_info):
+    """Raise ValueError unless the archive matches the hashes in the delta."""
+    if file_sha256(path) != delta_info["target_sha256"]:
+        raise ValueError("Rebuilt archive doesn't match the target version")
+    archive = ArchiveReader(path)
+    try:
+        if set(archive.entries) != set(delta_info["files"]):
+            raise ValueError("Rebuilt archive doesn't hold the files of the target version")
+        for name, sha256 in delta_info["files"].items():
+            if hashlib.sha256(archive.read(name)).hexdigest() != sha256:
+                raise ValueError(f"Rebuilt file doesn't match the target version: {name}")
+    finally:
+        archive.close()
+
+
+def apply_delta(base_path, delta_path, output_path=None):
+    """Rebuild and verify the target archive of a delta, and return its path."""
+    delta = ArchiveReader(delta_path)
+    try:
+        if DELTA_INFO_NAME not in delta.entries:
+            raise ValueError(f"Not a test version delta: {delta_path}")
+        delta_info = json.loads(delta.read(DELTA_INFO_NAME))
+        if delta_info.get("format") != DELTA_FORMAT:
+            raise ValueError(f"Unsupported delta format: {delta_info.get('format')}")
+        if file_sha256(base_path) != delta_info["base_sha256"]:
+            raise ValueError(f"{base_path} is not {delta_info['base']}, which the delta was made from")
+
+        output_path = output_path or os.path.join(os.path.dirname(base_path), delta_info["target"])
+        changed = set(delta_info["changed"])
+        fd, temp_path = create_temp_file(os.path.dirname(output_path) or ".", ".mcaddon.tmp")
+        base = ArchiveReader(base_path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                archive = ZipAssembler(f)
+                for name in delta_info["entries"]:
+                    source = delta if name in changed else base
+                    if name not in source.entries:
+                        raise ValueError(f"Missing entry in {source.path}: {name}")
+                    source.copy_entry(source.entries[name], archive)
+                archive.close()
+            verify_archive(temp_path, delta_info)
+            os.replace(temp_path, output_path)
+        finally:
+            base.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    finally:
+        delta.close()
+    return output_path
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print(__doc__.strip())
+        return 2
+    try:
+        output_path = apply_delta(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) == 4 else None)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    print(f"[INFO] Rebuilt and verified: {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Round-trip check of the zip writer against zipfile.
+
+    python check_archive.py
+
+Packages a sample folder (deflated and stored files, an executable, a
+non-ASCII name, an empty file) with ZipAssembler and with zipfile.ZipFile,
+and fails unless both archives are byte-identical and zipfile reads back
+the same contents and permissions.
+"""
+import os
+import sys
+import tempfile
+import zipfile
+
+from main import ZipAssembler, iter_compressed_files, list_folder_files
+
+
+SAMPLE_FILES = {
+    "manifest.json": (b'{"format_version": 2, "header": {"name": "check"}}\n' * 20, 0o644),
+    "textures/blocks/stone.png": (os.urandom(4096), 0o644),
+    "scripts/run.sh": (b"#!/bin/sh\necho packaged\n", 0o755),
+    "texts/été.lang": ("pack.name=Été\n".encode('utf-8'), 0o644),
+    "empty.txt": (b"", 0o600),
+}
+
+
+def write_sample(folder):
+    for name, (data, mode) in SAMPLE_FILES.items():
+        path = os.path.join(folder, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        os.chmod(path, mode)
+
+
+def check_archive(folder, level=-1):
+    """Return a list of the differences between ZipAssembler and zipfile output."""
+    sources = list_folder_files(folder, "check_BP")
+    compressed_files = [compressed for compressed, _ in iter_compressed_files(sources, level, 1)]
+    assembled_path = os.path.join(folder, "assembled.zip")
+    reference_path = os.path.join(folder, "reference.zip")
+
+    with open(assembled_path, 'wb') as f:
+        archive = ZipAssembler(f)
+        for source, compressed in zip(sources, compressed_files):
+            archive.add(source.arcname, compressed, source.date_time, source.external_attr)
+        archive.close()
+
+    with zipfile.ZipFile(reference_path, 'w') as reference:
+        for source, compressed in zip(sources, compressed_files):
+            info = zipfile.ZipInfo(source.arcname, source.date_time)
+            info.create_system = 3
+            info.external_attr = source.external_attr
+            info.compress_type = compressed.compress_type
+            with open(source.filepath, 'rb') as f:
+                reference.writestr(info, f.read(), compresslevel=None if level == -1 else level)
+
+    problems = []
+    with open(assembled_path, 'rb') as f, open(reference_path, 'rb') as g:
+        if f.read() != g.read():
+            problems.append("archive bytes differ from zipfile.ZipFile")
+    with zipfile.ZipFile(assembled_path) as archive:
+        if archive.testzip() is not None:
+            problems.append(f"bad CRC: {archive.testzip()}")
+        for source, info in zip(sources, archive.infolist()):
+            with open(source.filepath, 'rb') as f:
+                if archive.read(info) != f.read():
+                    problems.append(f"content differs: {info.filename}")
+            if info.filename != source.arcname or info.create_system != 3:
+                problems.append(f"header differs: {info.filename}")
+            if info.external_attr >> 16 != os.stat(source.filepath).st_mode & 0xFFFF:
+                problems.append(f"mode differs: {info.filename}")
+    return problems
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        sample = os.path.join(folder, "sample")
+        write_sample(sample)
+        problems = check_archive(sample)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[INFO] ZipAssembler output matches zipfile")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
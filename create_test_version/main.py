@@ -1,7 +1,85 @@
 import os
+import sys
+import time
+import hashlib
+import struct
 import zipfile
+import zlib
 import json
 import re
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple
+
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# How this filter has always prefixed its messages
+LOG_PREFIXES = {"debug": "[DEBUG] ", "info": "[INFO] ", "warning": "[WARN] ", "error": "[ERROR] "}
+
+class Instrumentation:
+    """Phase timers, counters and leveled logging, configured by the log_level and timing_report settings."""
+
+    def __init__(self, filter_name):
+        self.filter_name = filter_name
+        self.level = LOG_LEVELS["info"]
+        self.report_path = None
+        self.phases: Dict[str, float] = {}
+        self.counters = Counter()
+        self.started = time.perf_counter()
+
+    def configure(self, settings):
+        self.level = LOG_LEVELS.get(str(settings.get("log_level", "info")).lower(), LOG_LEVELS["info"])
+        report = settings.get("timing_report", False)
+        if report is True:
+            self.report_path = os.path.join("data", self.filter_name, "timing_report.json")
+        elif isinstance(report, str) and report:
+            self.report_path = report
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block; repeated phases of the same name add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def log(self, level, message):
+        if LOG_LEVELS[level] >= self.level:
+            print(LOG_PREFIXES[level] + message)
+
+    def debug(self, message):
+        self.log("debug", message)
+
+    def info(self, message):
+        self.log("info", message)
+
+    def warning(self, message):
+        self.log("warning", message)
+
+    def error(self, message):
+        self.log("error", message)
+
+    def write_report(self):
+        if not self.report_path:
+            return
+        report = {
+            "filter": self.filter_name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.info(f"Timing report written to {self.report_path}")
+
+instrumentation = Instrumentation("create_test_version")
 
 
 def load_project_name(config_path):
@@ -17,16 +95,344 @@ def load_project_name(config_path):
         raise RuntimeError(f"Error loading config: {e}")
 
 
-def zip_folder(source_folder, archive, prefix):
-    """Zip all files in a folder with a given prefix inside the archive."""
+# Already compressed formats, deflating them again costs time and saves nothing
+STORED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".ogg", ".mp3", ".fsb", ".zip", ".mcpack", ".mcaddon", ".mcworld"}
+
+
+class ZipSource(NamedTuple):
+    filepath: str
+    arcname: str
+    size: int
+    mtime_ns: int
+    date_time: tuple
+    external_attr: int
+
+
+class CompressedFile(NamedTuple):
+    crc: int
+    file_size: int
+    compress_type: int
+    data: bytes
+
+
+# Timestamp and permissions of every entry in reproducible archives
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+REPRODUCIBLE_EXTERNAL_ATTR = 0o100644 << 16
+
+
+def list_folder_files(source_folder, prefix, reproducible=False):
+    """List the files of a folder with their archive names, in sorted order."""
     if not os.path.exists(source_folder):
-        print(f"[WARN] Folder does not exist: {source_folder}")
-        return
-    for root, _, files in os.walk(source_folder):
-        for file in files:
+        instrumentation.warning(f"Folder does not exist: {source_folder}")
+        return []
+    sources = []
+    for root, dirs, files in os.walk(source_folder):
+        dirs.sort()
+        for file in sorted(files):
             filepath = os.path.join(root, file)
-            arcname = os.path.relpath(filepath, source_folder)
-            archive.write(filepath, os.path.join(prefix, arcname))
+            arcname = os.path.join(prefix, os.path.relpath(filepath, source_folder))
+            st = os.stat(filepath)
+            if reproducible:
+                date_time, external_attr = REPRODUCIBLE_DATE_TIME, REPRODUCIBLE_EXTERNAL_ATTR
+            else:
+                date_time, external_attr = zip_date_time(st.st_mtime), (st.st_mode & 0xFFFF) << 16
+            sources.append(ZipSource(
+                filepath, arcname.replace(os.sep, "/"), st.st_size, st.st_mtime_ns, date_time, external_attr,
+            ))
+    return sources
+
+
+def zip_date_time(mtime):
+    """Return the timestamp a zip entry stores for an mtime (from 1980, 2 second resolution)."""
+    date_time = max(time.localtime(mtime)[0:6], (1980, 1, 1, 0, 0, 0))
+    return date_time[:5] + (date_time[5] // 2 * 2,)
+
+
+def create_temp_file(dir_path, suffix):
+    """Create a temp file in dir_path with normal permissions and return (fd, path)."""
+    while True:
+        temp_path = os.path.join(dir_path, f"tmp{os.urandom(6).hex()}{suffix}")
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def file_crc32(filepath):
+    crc = 0
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def compress_data(data, level, store=False):
+    """Deflate data, or store it when asked to or when deflating doesn't make it smaller."""
+    crc = zlib.crc32(data)
+    if not store:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return CompressedFile(crc, len(data), zipfile.ZIP_DEFLATED, compressed)
+    return CompressedFile(crc, len(data), zipfile.ZIP_STORED, data)
+
+
+# Bump when the optimizers change, so cached outputs are rebuilt
+OPTIMIZER_VERSION = 1
+ASSET_CACHE_DIR = os.path.join("data", "create_test_version", "asset_cache")
+# Strings are kept, comments and whitespace between tokens are dropped
+JSON_TOKEN = re.compile(r'("(?:[^"\\]|\\.)*")|//[^\n]*|/\*.*?\*/|\s+', re.S)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Metadata chunks that don't affect the image
+PNG_DROPPED_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+
+def minify_json(data):
+    """Return the JSON without comments and whitespace, or None if it isn't valid JSON."""
+    try:
+        minified = JSON_TOKEN.sub(lambda match: match.group(1) or "", data.decode('utf-8-sig'))
+        json.loads(minified)
+    except ValueError:
+        return None
+    return minified.encode('utf-8')
+
+
+def optimize_png(data):
+    """Losslessly recompress a PNG and drop its text chunks, or return None if it can't be parsed."""
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    chunks = []
+    idat = []
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        if pos + 8 > len(data):
+            return None
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if len(body) != length:
+            return None
+        pos += 12 + length
+        if chunk_type == b"IDAT":
+            if not idat:
+                chunks.append((chunk_type, None))
+            idat.append(body)
+        elif chunk_type not in PNG_DROPPED_CHUNKS:
+            chunks.append((chunk_type, body))
+        if chunk_type == b"IEND":
+            break
+    if not idat:
+        return None
+    try:
+        image_data = zlib.decompress(b"".join(idat))
+    except zlib.error:
+        return None
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9)
+    image_data = compressor.compress(image_data) + compressor.flush()
+
+    output = [PNG_SIGNATURE]
+    for chunk_type, body in chunks:
+        body = image_data if body is None else body
+        output.append(struct.pack(">I4s", len(body), chunk_type) + body + struct.pack(">I", zlib.crc32(chunk_type + body)))
+    return b"".join(output)
+
+
+ASSET_OPTIMIZERS = {".json": minify_json, ".png": optimize_png}
+
+
+class AssetCache:
+    """Optimized assets cached by the sha256 of the original."""
+
+    def __init__(self, cache_dir=ASSET_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def handles(filepath):
+        return os.path.splitext(filepath)[1].lower() in ASSET_OPTIMIZERS
+
+    def get_path(self, sha256, ext):
+        return os.path.join(self.cache_dir, f"v{OPTIMIZER_VERSION}", sha256 + ext)
+
+    def cached_path(self, sha256, filepath):
+        """The cached output of a file with this hash, or None if it hasn't been optimized yet."""
+        path = self.get_path(sha256, os.path.splitext(filepath)[1].lower())
+        return path if os.path.exists(path) else None
+
+    def optimize(self, data, filepath):
+        """Return the optimized data, or the original when it can't be made smaller."""
+        ext = os.path.splitext(filepath)[1].lower()
+        path = self.get_path(hashlib.sha256(data).hexdigest(), ext)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+        optimized = ASSET_OPTIMIZERS[ext](data)
+        if optimized is None or len(optimized) >= len(data):
+            optimized = data
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = create_temp_file(os.path.dirname(path), ".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(optimized)
+        os.replace(temp_path, path)
+        return optimized
+
+    def prune(self, sha256s):
+        """Delete cached outputs of files no longer in the build and return how many were removed."""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        current_dir = f"v{OPTIMIZER_VERSION}"
+        removed = 0
+        for root, dirs, files in os.walk(self.cache_dir, topdown=False):
+            in_current = os.path.relpath(root, self.cache_dir) == current_dir
+            for file in files:
+                if in_current and os.path.splitext(file)[0] in sha256s:
+                    continue
+                os.remove(os.path.join(root, file))
+                removed += 1
+            if root != self.cache_dir and not in_current and not os.listdir(root):
+                os.rmdir(root)
+        return removed
+
+
+def compress_file(filepath, level, cache_dir=None):
+    """Read, optionally optimize, and deflate one file; runs on the worker processes."""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    if cache_dir and AssetCache.handles(filepath):
+        data = AssetCache(cache_dir).optimize(data, filepath)
+    return compress_data(data, level, store=os.path.splitext(filepath)[1].lower() in STORED_EXTENSIONS)
+
+
+class ArchiveReader:
+    """Reads the entries of an existing archive as raw compressed bytes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.infos = zipfile.ZipFile(self.file).infolist()
+        except Exception:
+            self.file.close()
+            raise
+        self.entries = {info.filename: info for info in self.infos}
+
+    def read_raw(self, info):
+        """Return the CompressedFile of an entry, exactly as stored."""
+        self.file.seek(info.header_offset)
+        name_length, extra_length = struct.unpack("<2H", self.file.read(30)[26:30])
+        self.file.seek(info.header_offset + 30 + name_length + extra_length)
+        return CompressedFile(info.CRC, info.file_size, info.compress_type, self.file.read(info.compress_size))
+
+    def read(self, name):
+        """Return the uncompressed contents of an entry."""
+        compressed = self.read_raw(self.entries[name])
+        data = zlib.decompress(compressed.data, -15) if compressed.compress_type == zipfile.ZIP_DEFLATED else compressed.data
+        if zlib.crc32(data) != compressed.crc:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for {name} in {self.path}")
+        return data
+
+    def copy_entry(self, info, archive):
+        """Add an entry to a ZipAssembler with the same contents and attributes."""
+        archive.add(info.filename, self.read_raw(info), info.date_time, info.external_attr)
+
+    def same_entry(self, info, other):
+        """Whether an entry of another reader would be written out identically."""
+        mine = self.entries.get(info.filename)
+        return (mine is not None
+                and (mine.CRC, mine.file_size, mine.compress_type, mine.date_time, mine.external_attr)
+                == (info.CRC, info.file_size, info.compress_type, info.date_time, info.external_attr)
+                and self.read_raw(mine).data == other.read_raw(info).data)
+
+    def reuse(self, source, data_path=None):
+        """Return the entry of an unchanged file (same size, mtime and CRC), or None."""
+        info = self.entries.get(source.arcname)
+        size = os.path.getsize(data_path) if data_path else source.size
+        if (info is None or info.file_size != size or info.date_time != source.date_time
+                or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) or info.flag_bits & 0x1):
+            return None
+        if file_crc32(data_path or source.filepath) != info.CRC:
+            return None
+        return self.read_raw(info)
+
+    def close(self):
+        self.file.close()
+
+
+def iter_compressed_files(sources, level, workers, previous=None, asset_cache=None, hashes=None):
+    """Yield (compressed file, reused) in input order, reusing entries of the previous archive."""
+    def resolve(item):
+        result, reused = item
+        return (result.result() if isinstance(result, Future) else result), reused
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    window = workers * 4 if executor else 1
+    try:
+        pending = deque()
+        cache_dir = asset_cache.cache_dir if asset_cache else None
+        for source in sources:
+            reused = None
+            if previous:
+                if asset_cache and asset_cache.handles(source.filepath):
+                    # Only reusable once the optimized output is cached
+                    data_path = asset_cache.cached_path(hashes[source.arcname], source.filepath)
+                    reused = previous.reuse(source, data_path) if data_path else None
+                else:
+                    reused = previous.reuse(source)
+            if reused is not None:
+                pending.append((reused, True))
+            elif executor:
+                pending.append((executor.submit(compress_file, source.filepath, level, cache_dir), False))
+            else:
+                pending.append((compress_file(source.filepath, level, cache_dir), False))
+            if len(pending) >= window:
+                yield resolve(pending.popleft())
+        while pending:
+            yield resolve(pending.popleft())
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+class ZipAssembler:
+    """Writes a zip archive from already compressed entries, with the same headers as zipfile."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.central_directory: List[bytes] = []
+
+    def add(self, arcname, compressed, date_time, external_attr):
+        offset = self.fileobj.tell()
+        if offset > 0xFFFFFFFF or compressed.file_size > 0xFFFFFFFF or len(compressed.data) > 0xFFFFFFFF:
+            raise ValueError(f"Archive too large for a zip without zip64 at {arcname}")
+        try:
+            filename = arcname.encode('ascii')
+            flags = 0
+        except UnicodeEncodeError:
+            filename = arcname.encode('utf-8')
+            flags = 0x800
+        version = zipfile.DEFAULT_VERSION
+        dos_time = (date_time[3] << 11) | (date_time[4] << 5) | (date_time[5] // 2)
+        dos_date = ((date_time[0] - 1980) << 9) | (date_time[1] << 5) | date_time[2]
+        fields = (version, flags, compressed.compress_type, dos_time, dos_date,
+                  compressed.crc, len(compressed.data), compressed.file_size, len(filename))
+
+        self.fileobj.write(struct.pack("<4s5H3L2H", b"PK\x03\x04", *fields, 0))
+        self.fileobj.write(filename)
+        self.fileobj.write(compressed.data)
+        self.central_directory.append(
+            # Made by Unix, so extractors apply the mode bits in external_attr
+            struct.pack("<4s6H3L5H2L", b"PK\x01\x02", (3 << 8) | version, *fields, 0, 0, 0, 0, external_attr, offset)
+            + filename
+        )
+
+    def close(self):
+        start = self.fileobj.tell()
+        for record in self.central_directory:
+            self.fileobj.write(record)
+        size = self.fileobj.tell() - start
+        count = len(self.central_directory)
+        if count > 0xFFFF or start > 0xFFFFFFFF:
+            raise ValueError("Archive too large for a zip without zip64")
+        self.fileobj.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, count, count, size, start, 0))
 
 
 def parse_semver(filename, base_name):
@@ -38,59 +444,309 @@ def parse_semver(filename, base_name):
     return None
 
 
-def get_next_semver(output_dir, base_name):
-    """Get the next semantic version by incrementing the patch."""
-    highest = (0, 0, 0)
+def get_latest_semver(output_dir, base_name):
+    """Get the highest version in the output folder, or None."""
+    highest = None
 
     if not os.path.exists(output_dir):
         return highest
 
     for fname in os.listdir(output_dir):
         version = parse_semver(fname, base_name)
-        if version and version > highest:
+        if version and (highest is None or version > highest):
             highest = version
+    return highest
+
+
+def get_next_semver(output_dir, base_name):
+    """Get the next semantic version by incrementing the patch."""
+    if not os.path.exists(output_dir):
+        return (0, 0, 0)
 
     # Increment patch version
-    major, minor, patch = highest
+    major, minor, patch = get_latest_semver(output_dir, base_name) or (0, 0, 0)
     return (major, minor, patch + 1)
 
 
+def get_archive_path(output_dir, name, version):
+    return os.path.join(output_dir, f"{name}_v{format_semver(version)}.mcaddon")
+
+
+def get_manifest_path(archive_path):
+    """The content manifest stored next to an archive."""
+    return os.path.splitext(archive_path)[0] + ".manifest.json"
+
+
+def open_previous_archive(output_dir, name):
+    """Open the latest test version to reuse its entries, or return None."""
+    version = get_latest_semver(output_dir, name)
+    if version is None:
+        return None
+    path = get_archive_path(output_dir, name, version)
+    try:
+        return ArchiveReader(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        instrumentation.warning(f"Can't reuse entries of {path}: {e}")
+        return None
+
+
 def format_semver(version_tuple):
     return f"{version_tuple[0]}.{version_tuple[1]}.{version_tuple[2]}"
 
 
-def create_mcaddon(name, bp_path, rp_path, output_dir):
-    """Create versioned .mcaddon with semantic versioning."""
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_content_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_content_manifest(sources, previous_manifest=None, options=None):
+    """Hash every file of the build and combine the hashes and options into a build digest."""
+    previous_files = (previous_manifest or {}).get("files", {})
+    files = {}
+    for source in sources:
+        previous = previous_files.get(source.arcname)
+        if previous and previous.get("size") == source.size and previous.get("mtime_ns") == source.mtime_ns:
+            sha256 = previous["sha256"]
+        else:
+            sha256 = file_sha256(source.filepath)
+            instrumentation.count("files_hashed")
+        files[source.arcname] = {"sha256": sha256, "size": source.size, "mtime_ns": source.mtime_ns}
+
+    digest = hashlib.sha256()
+    for arcname in sorted(files):
+        digest.update(f"{arcname}\0{files[arcname]['sha256']}\n".encode('utf-8'))
+    options = options or {}
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return {"digest": digest.hexdigest(), "files": files, "options": options}
+
+
+def save_content_manifest(manifest_path, manifest):
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+DELTA_FORMAT = 1
+DELTA_INFO_NAME = "delta.json"
+
+
+def get_delta_path(archive_path):
+    """The delta from the previous version, stored next to an archive."""
+    return os.path.splitext(archive_path)[0] + ".mcdelta"
+
+
+def create_delta(base_path, target_path, file_hashes):
+    """Write the delta that turns the base archive into the target archive."""
+    delta_path = get_delta_path(target_path)
+    base = ArchiveReader(base_path)
+    try:
+        target = ArchiveReader(target_path)
+        try:
+            changed = [info for info in target.infos if not base.same_entry(info, target)]
+            removed = sorted(set(base.entries) - set(target.entries))
+            delta_info = {
+                "format": DELTA_FORMAT,
+                "base": os.path.basename(base_path),
+                "base_sha256": file_sha256(base_path),
+                "target": os.path.basename(target_path),
+                "target_sha256": file_sha256(target_path),
+                "entries": [info.filename for info in target.infos],
+                "changed": [info.filename for info in changed],
+                "removed": removed,
+                "files": dict(sorted(file_hashes.items())),
+            }
+            with open(delta_path, 'wb') as f:
+                archive = ZipAssembler(f)
+                for info in changed:
+                    target.copy_entry(info, archive)
+                archive.add(
+                    DELTA_INFO_NAME,
+                    compress_data(json.dumps(delta_info, indent=2).encode('utf-8'), zlib.Z_DEFAULT_COMPRESSION),
+                    REPRODUCIBLE_DATE_TIME, REPRODUCIBLE_EXTERNAL_ATTR,
+                )
+                archive.close()
+        finally:
+            target.close()
+    finally:
+        base.close()
+    return delta_path, changed, removed
+
+
+def apply_retention(output_dir, name, keep_versions):
+    """Delete all but the newest 'keep_versions' archives and their manifests and deltas."""
+    versions = sorted(
+        (version for version in (parse_semver(fname, name) for fname in os.listdir(output_dir)) if version),
+        reverse=True,
+    )
+    for version in versions[keep_versions:]:
+        archive_path = get_archive_path(output_dir, name, version)
+        for path in (archive_path, get_manifest_path(archive_path), get_delta_path(archive_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        instrumentation.info(f"Removed old test version: {archive_path}")
+        instrumentation.count("versions_removed")
+
+
+def create_mcaddon(name, bp_path, rp_path, output_dir, level=-1, workers=1, reuse_previous=True,
+                   skip_unchanged=True, keep_versions=0, reproducible=True, delta=True, optimize_assets=False):
+    """Create versioned .mcaddon with semantic versioning and return its path."""
     os.makedirs(output_dir, exist_ok=True)
 
+    sources = (list_folder_files(bp_path, f"{name}_BP", reproducible)
+               + list_folder_files(rp_path, f"{name}_RP", reproducible))
+    latest_version = get_latest_semver(output_dir, name)
+    latest_path = get_archive_path(output_dir, name, latest_version) if latest_version else None
+    latest_manifest = load_content_manifest(get_manifest_path(latest_path)) if latest_path else None
+    # Everything that changes the archive bytes for the same build
+    options = {
+        "compression_level": level,
+        "reproducible": reproducible,
+        "optimize_assets": OPTIMIZER_VERSION if optimize_assets else False,
+    }
+    with instrumentation.phase("hash"):
+        content_manifest = build_content_manifest(sources, latest_manifest, options)
+
+    if skip_unchanged and latest_manifest and latest_manifest.get("digest") == content_manifest["digest"] \
+            and os.path.exists(latest_path):
+        instrumentation.info(f"Build unchanged (digest {content_manifest['digest'][:12]}), latest test version: {latest_path}")
+        instrumentation.count("versions_skipped")
+        # Record the current mtimes so the next run doesn't hash touched files again
+        if content_manifest != latest_manifest:
+            save_content_manifest(get_manifest_path(latest_path), content_manifest)
+        if keep_versions > 0:
+            apply_retention(output_dir, name, keep_versions)
+        return latest_path
+
+    # Entries compressed at another level are compressed again
+    same_level = (latest_manifest or {}).get("options", {}).get("compression_level") == level
+    previous = open_previous_archive(output_dir, name) if reuse_previous and same_level else None
+    asset_cache = AssetCache() if optimize_assets else None
+    hashes = {arcname: entry["sha256"] for arcname, entry in content_manifest["files"].items()}
     version = get_next_semver(output_dir, name)
-    version_str = format_semver(version)
-    mcaddon_filename = f"{name}_v{version_str}.mcaddon"
-    mcaddon_path = os.path.join(output_dir, mcaddon_filename)
+    mcaddon_path = get_archive_path(output_dir, name, version)
 
-    with zipfile.ZipFile(mcaddon_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        zip_folder(bp_path, zipf, f"{name}_BP")
-        zip_folder(rp_path, zipf, f"{name}_RP")
+    stats = Counter()
+    try:
+        with instrumentation.phase("zip"):
+            with open(mcaddon_path, 'wb') as f:
+                archive = ZipAssembler(f)
+                entries = iter_compressed_files(sources, level, workers, previous, asset_cache, hashes)
+                for source, (compressed, reused) in zip(sources, entries):
+                    archive.add(source.arcname, compressed, source.date_time, source.external_attr)
+                    if asset_cache and asset_cache.handles(source.filepath):
+                        ext = os.path.splitext(source.filepath)[1].lower()
+                        stats[f"bytes_original_{ext[1:]}"] += source.size
+                        stats[f"bytes_optimized_{ext[1:]}"] += compressed.file_size
+                    if reused:
+                        stats["entries_reused"] += 1
+                        stats["bytes_reused"] += compressed.file_size
+                    else:
+                        stats["entries_recompressed"] += 1
+                        stats["files_stored" if compressed.compress_type == zipfile.ZIP_STORED else "files_deflated"] += 1
+                    stats["files_zipped"] += 1
+                    stats["bytes_uncompressed"] += compressed.file_size
+                archive.close()
+    finally:
+        if previous:
+            previous.close()
+    for counter, amount in stats.items():
+        instrumentation.count(counter, amount)
+    instrumentation.count("bytes_compressed", os.path.getsize(mcaddon_path))
+
+    if asset_cache:
+        for ext in sorted(ASSET_OPTIMIZERS):
+            original, optimized = stats[f"bytes_original_{ext[1:]}"], stats[f"bytes_optimized_{ext[1:]}"]
+            if original:
+                instrumentation.info(
+                    f"Optimized {ext} assets: {original} -> {optimized} bytes "
+                    f"(saved {original - optimized}, {(original - optimized) / original:.0%})"
+                )
+    if previous:
+        instrumentation.info(
+            f"Reused {stats['entries_reused']} entries from {os.path.basename(previous.path)} "
+            f"({stats['bytes_reused']} bytes not recompressed), recompressed {stats['entries_recompressed']}"
+        )
+    save_content_manifest(get_manifest_path(mcaddon_path), content_manifest)
+    instrumentation.info(f"MCAddon created at: {mcaddon_path}")
+
+    if delta and latest_path and os.path.exists(latest_path):
+        try:
+            with instrumentation.phase("delta"):
+                if asset_cache:
+                    # Optimized files are packaged from the cache, hash what was packaged
+                    for source in sources:
+                        if asset_cache.handles(source.filepath):
+                            hashes[source.arcname] = file_sha256(
+                                asset_cache.cached_path(hashes[source.arcname], source.filepath)
+                            )
+                delta_path, changed, removed = create_delta(latest_path, mcaddon_path, hashes)
+        except (OSError, zipfile.BadZipFile) as e:
+            instrumentation.warning(f"Can't create a delta from {latest_path}: {e}")
+        else:
+            delta_size = os.path.getsize(delta_path)
+            instrumentation.count("delta_entries", len(changed))
+            instrumentation.count("delta_removed", len(removed))
+            instrumentation.count("bytes_delta", delta_size)
+            instrumentation.info(
+                f"Delta created at: {delta_path} ({len(changed)} added or changed, {len(removed)} removed, "
+                f"{delta_size} bytes, {delta_size / max(1, os.path.getsize(mcaddon_path)):.0%} of the full archive)"
+            )
+
+    if asset_cache:
+        sha256s = {entry["sha256"] for entry in content_manifest["files"].values()}
+        instrumentation.count("cache_files_removed", asset_cache.prune(sha256s))
 
-    print(f"[INFO] MCAddon created at: {mcaddon_path}")
+    if keep_versions > 0:
+        apply_retention(output_dir, name, keep_versions)
+    return mcaddon_path
 
 
 def main():
+    try:
+        settings = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+    except json.JSONDecodeError as e:
+        instrumentation.error(f"Invalid settings: {e}")
+        settings = {}
+    instrumentation.configure(settings)
+
     config_path = "../../config.json"
     build_dir = "../../build"
     test_output_dir = "../../testversion"
 
     try:
-        project_name = load_project_name(config_path)
+        with instrumentation.phase("load"):
+            project_name = load_project_name(config_path)
         bp_path = os.path.join(build_dir, f"{project_name}_BP")
         rp_path = os.path.join(build_dir, f"{project_name}_RP")
         output_dir = test_output_dir
 
 
-        create_mcaddon(project_name, bp_path, rp_path, output_dir)
+        create_mcaddon(
+            project_name, bp_path, rp_path, output_dir,
+            level=int(settings.get("compression_level", -1)),
+            workers=max(1, int(settings.get("workers", 1))),
+            reuse_previous=settings.get("reuse_previous", True),
+            skip_unchanged=settings.get("skip_unchanged", True),
+            keep_versions=int(settings.get("keep_versions", 0)),
+            reproducible=settings.get("reproducible", True),
+            delta=settings.get("delta", True),
+            optimize_assets=settings.get("optimize_assets", False),
+        )
 
     except Exception as e:
-        print(f"[ERROR] {e}")
+        instrumentation.error(e)
+
+    instrumentation.write_report()
 
 
 if __name__ == "__main__":
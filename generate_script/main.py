@@ -1,35 +1,240 @@
 import os
+import functools
+import glob
+import hashlib
+import decimal
 import json
+import re
 import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional
 
-# Load the JSON file
-try:
-    with open("data/jsonte/data_files/entities.json", "r") as file:
-        data = json.load(file)
-except FileNotFoundError:
-    print("Error: JSON file not found at 'data/jsonte/data_files/entities.json'.")
-    sys.exit(1)
-except json.JSONDecodeError as e:
-    print(f"Error: Failed to parse JSON file. Details: {e}")
-    sys.exit(1)
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# How this filter has always prefixed its messages
+LOG_PREFIXES = {"debug": "", "info": "", "warning": "Warning: ", "error": "Error: "}
 
-# Parse configuration from command-line arguments
-try:
-    config = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
-except json.JSONDecodeError as e:
-    print(f"Error: Failed to parse command-line JSON argument. Details: {e}")
-    sys.exit(1)
+class Instrumentation:
+    """Phase timers, counters and leveled logging, configured by the log_level and timing_report settings."""
 
-# Handle short_path in configuration
-short_path = config.get("short_path", "")  # Default to an empty string if not provided
-if not short_path:
-    print("Warning: 'short_path' is not provided in the configuration. Using default path.")
+    def __init__(self, filter_name):
+        self.filter_name = filter_name
+        self.level = LOG_LEVELS["info"]
+        self.report_path = None
+        self.phases: Dict[str, float] = {}
+        self.counters = Counter()
+        self.started = time.perf_counter()
 
-# Base output directory
-base_output_dir = os.path.join("BP", "scripts", short_path, "entitySubscriptions") if short_path else os.path.join("BP", "scripts", "entitySubscriptions")
-os.makedirs(base_output_dir, exist_ok=True)
+    def configure(self, settings):
+        self.level = LOG_LEVELS.get(str(settings.get("log_level", "info")).lower(), LOG_LEVELS["info"])
+        report = settings.get("timing_report", False)
+        if report is True:
+            self.report_path = os.path.join("data", self.filter_name, "timing_report.json")
+        elif isinstance(report, str) and report:
+            self.report_path = report
 
-print(f"Output directory created (or already exists): {base_output_dir}")
+    @contextmanager
+    def phase(self, name):
+        """Time a block; repeated phases of the same name add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def log(self, level, message):
+        if LOG_LEVELS[level] >= self.level:
+            print(LOG_PREFIXES[level] + message)
+
+    def debug(self, message):
+        self.log("debug", message)
+
+    def info(self, message):
+        self.log("info", message)
+
+    def warning(self, message):
+        self.log("warning", message)
+
+    def error(self, message):
+        self.log("error", message)
+
+    def write_report(self):
+        if not self.report_path:
+            return
+        report = {
+            "filter": self.filter_name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.info(f"Timing report written to {self.report_path}")
+
+instrumentation = Instrumentation("generate_script")
+
+DATA_DIR = os.path.join("data", "jsonte", "data_files")
+DATA_FILE = os.path.join(DATA_DIR, "entities.json")
+MANIFEST_PATH = os.path.join("data", "generate_script", "manifest.json")
+
+def get_output_dir(short_path):
+    """Return the entitySubscriptions folder for a short_path."""
+    return os.path.join("BP", "scripts", short_path, "entitySubscriptions") if short_path else os.path.join("BP", "scripts", "entitySubscriptions")
+
+STREAM_CHUNK_SIZE = 1 << 16
+JSON_NUMBER_END = re.compile(r"[^0-9.eE+-]")
+
+class MobRecord(NamedTuple):
+    source: str
+    index: int
+    mob: Optional[dict]
+    error: Optional[str] = None
+
+    @property
+    def location(self):
+        return f"{self.source}, advance_mob[{self.index}]" if self.index >= 0 else self.source
+
+class JsonStreamReader:
+    """Reads a JSON file one value at a time from a sliding buffer."""
+
+    def __init__(self, file):
+        self.file = file
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0  # characters dropped from the front of the buffer
+        self.eof = False
+
+    def fill(self):
+        chunk = self.file.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character, or "" at the end of the file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at char {self.offset + self.pos}")
+        self.pos += 1
+
+    def skip(self, char):
+        """Consume char if it comes next."""
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # Most likely cut off by the end of the buffer
+                if self.fill():
+                    continue
+                raise ValueError(f"{e.msg} at char {self.offset + e.pos}") from None
+            # A number is only complete once something other than digits follows it
+            if isinstance(value, (int, float)) and not JSON_NUMBER_END.search(self.buffer, end) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+def check_mob(mob):
+    """Return why an advance_mob record can't be generated, or None."""
+    if not isinstance(mob, dict):
+        return "record is not an object"
+    if not isinstance(mob.get("name"), str):
+        return "missing 'name'"
+    if not isinstance(mob.get("attacks"), list):
+        return "missing 'attacks'"
+    for attack_index, attack in enumerate(mob["attacks"]):
+        if not isinstance(attack, dict) or "id" not in attack:
+            return f"attacks[{attack_index}] is missing 'id'"
+    return None
+
+def iter_data_file_mobs(file_path):
+    """Yield (index, record) for the advance_mob array of a data file. Raises ValueError."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        reader = JsonStreamReader(file)
+        reader.expect("{")
+        if reader.skip("}"):
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "advance_mob":
+                reader.expect("[")
+                index = 0
+                if not reader.skip("]"):
+                    while True:
+                        yield index, reader.value()
+                        index += 1
+                        if not reader.skip(","):
+                            reader.expect("]")
+                            break
+            else:
+                reader.value()
+            if not reader.skip(","):
+                reader.expect("}")
+                return
+
+def resolve_data_files(data_files):
+    """Expand a data file, a folder of .json files or a glob into a sorted list of paths."""
+    if os.path.isdir(data_files):
+        return sorted(
+            os.path.join(data_files, filename) for filename in os.listdir(data_files)
+            if filename.endswith(".json") and os.path.isfile(os.path.join(data_files, filename))
+        )
+    if os.path.isfile(data_files):
+        return [data_files]
+    return sorted(file_path for file_path in glob.glob(data_files, recursive=True) if os.path.isfile(file_path))
+
+def iter_file_records(file_path):
+    """Stream the MobRecords of one data file; an unreadable file yields a record with the error."""
+    try:
+        for index, mob in iter_data_file_mobs(file_path):
+            error = check_mob(mob)
+            yield MobRecord(file_path, index, mob if error is None else None, error)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        yield MobRecord(file_path, -1, None, f"Failed to read data file. Details: {e}")
+
+def check_duplicates(records):
+    """Turn records of a mob name that was already defined into errors."""
+    seen: Dict[str, str] = {}
+    for record in records:
+        if record.error is None:
+            if record.mob["name"] in seen:
+                record = record._replace(
+                    mob=None, error=f"duplicate mob '{record.mob['name']}', first defined in {seen[record.mob['name']]}"
+                )
+            else:
+                seen[record.mob["name"]] = record.location
+        yield record
+
+def load_mobs(data_files):
+    """Stream the MobRecords of the data files in order, with errors for unreadable or invalid ones."""
+    return check_duplicates(record for file_path in data_files for record in iter_file_records(file_path))
 
 
 def to_camel_case(s):
@@ -77,119 +282,185 @@ def generate_switch_case(entity_name, attack_id):
     """Generate switch case for an attack."""
     return f"""    [identifier('{attack_id}'), {entity_name}{to_camel_case(attack_id)}]"""
 
+def generate_dispatch_module(mobs):
+    """Generate dispatch.js, one listener looking handlers up by entity typeId and attack id."""
+    imports = []
+    entries = []
+    for mob in mobs:
+        entity_name = mob["name"]
+        entity_name_camel = to_camel_case(entity_name)
+        function_names = [entity_name_camel + to_camel_case(attack["id"]) for attack in mob["attacks"]]
+        imports.append(f"import {{ {', '.join(function_names)} }} from './{entity_name_camel}/functions';")
+        attack_entries = ",\n".join(
+            f"        [identifier('{attack['id']}'), {function_name}]"
+            for attack, function_name in zip(mob["attacks"], function_names)
+        )
+        entries.append(f"""    [identifier('{entity_name}'), new Map([
+{attack_entries}
+    ])]""")
+
+    import_lines = "\n".join(imports)
+    dispatch_entries = ",\n".join(entries)
+    return f"""// Attack dispatch for all advance_mob entities, generated by generate_script
+{import_lines}
+import {{ identifier }} from '../utils';
+
+// entity typeId -> attack id -> handler
+const attackDispatch = new Map([
+{dispatch_entries}
+]);
+
+function dispatchAttack(entity, eventId) {{
+    const attackHandlers = attackDispatch.get(entity.typeId);
+    if (!attackHandlers) return;
+
+    const attackHandler = attackHandlers.get(eventId);
+    if (attackHandler) attackHandler(entity);
+}}
+
+export const AttackDispatch = [
+    {{
+        eventName: "onDataDrivenEntityTrigger",
+        param: ["entity", "eventId"],
+        func: dispatchAttack,
+        priority: 2
+    }}
+];
+"""
+
 def to_camel_case(snake_str):
     """Convert snake_case to CamelCase."""
     components = snake_str.split('_')
     return ''.join(x.title() for x in components)
 
-def generate_function_template(entity_name, attack_id, template_type):
-    """Generate function template for an attack based on the template type."""
-    templates = {
-        "basic": f"""
-export async function {to_camel_case(entity_name)}{to_camel_case(attack_id)}(entity) {{
-    const config = {to_camel_case(entity_name).upper()}_CONFIG.{attack_id.upper()};
-    const damage = utils.randomInt(...config.DAMAGE_RANGE);
-    utils.delayExecute(config.CAST_DURATION, () => {{
-        utils.executeIfValid(entity, () => {{
-        utils.resetAndReadyAbility(entity);
-        }});
-    }});
-    utils.resetFamilyAttack(entity, ['{entity_name}']);
-    utils.executeIfValid(entity, () => {{
-      entity.setProperty(utils.identifier('animations'), config.ANIMATION);
-    }});
-    utils.facePlayer(entity, 1);
-    utils.delayExecute(config.ATTACK_TIME, () => {{
-        utils.executeIfValid(entity, () => {{
-            utils.getTargets(entity, {{
-                position: utils.getPosForward(entity, 2),
-                radius: config.RADIUS,
-                callback: (victim) => {{
-                    victim.applyDamage(damage, {{ cause: EntityDamageCause.entityAttack, damagingEntity: entity }})
-                    utils.normalizedKnockBack(entity.location, victim, 0.3, 2.6, 'default');
-                }}
-            }})
-        }});
-    }});
-}}
-""",
-        "courotine": f"""
-export async function {to_camel_case(entity_name)}{to_camel_case(attack_id)}(entity) {{
-    const config = {to_camel_case(entity_name).upper()}_CONFIG.{attack_id.upper()};
-    utils.tipPlayer(entity, config.TIP_DURATION, config.TIP_MESSAGE);
-    utils.facePlayer(entity, 1);
-
-    utils.resetFamilyAttack(entity, ['{entity_name}']);
-
-    let active = function* () {{
-        utils.facePlayer(entity, 1);
-        yield 5;
-        utils.executeIfValid(entity, () => {{
-            entity.setProperty(utils.identifier('animations'), config.ANIMATION);
-        }});
-        utils.facePlayer(entity, (0.56 * 20));
-        yield (0.56 * 20);
-        utils.applyImpulse(entity, 1.3, 8.2, -6);
-        utils.getTargets(entity, {{
-            position: utils.getPosForward(entity, 2),
-            radius: (config.RADIUS + 3),
-            target: "multiple",
-            callback: (victim) => {{
-                utils.normalizedKnockBack(entity.location, victim, 0.2, 1.7, 'default');
-            }}
-        }})
-        utils.addEffect(entity, 'slow_falling', 3, 1);
-        yield 20;
-        while (!entity.isOnGround) {{
-            utils.applyImpulse(entity, 0.5, -0.4, -0.1);
-            utils.addEffect(entity, 'slow_falling', 1, 1);
-            utils.facePlayer(entity, 1);
-            yield 5; // Pause for 5 tick before re-checking
-        }};
-
-        yield (2.96 * 20);
-    }}.bind(this);
-
-    startCoroutineForBoss(active, () => {{
-        if (!entity.isValid()) return;
-        entity.addTag(utils.identifier('{attack_id}'));
-        const setCoolDown = Date.now() + 100 * config.CAST_DURATION + config.COOLDOWN;
-        utils.setAbilityCooldown(entity.id, '{attack_id}', setCoolDown);
-        utils.resetAndReadyAbility(entity);
-    }}, entity.id);
-}}
-"""
-    }
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+TEMPLATE_FIELD = re.compile(r"\{\{\s*([a-z_]+)\s*\}\}")
+# The fields generate_function_template provides
+TEMPLATE_FIELDS = {"function_name", "config_name", "attack_key", "attack_id", "entity_name"}
+# A parenthesized operation on two number literals, not a call argument list
+CONSTANT_EXPRESSION = re.compile(r"(?<![\w$)\]])\(\s*(-?\d+(?:\.\d+)?)\s*([-+*/])\s*(-?\d+(?:\.\d+)?)\s*\)")
+JS_STRING_OR_COMMENT = re.compile(
+    r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|`(?:[^`\\]|\\.)*`|//[^\n]*|/\*.*?\*/', re.S
+)
 
-    return templates.get(template_type, "Invalid template type!")
+class UnknownTemplateError(ValueError):
+    pass
 
+def format_js_number(left, operator, right):
+    """Return the exact result of a constant operation as a JS literal, or None if JS computes another number."""
+    try:
+        exact = {"+": lambda: left + right, "-": lambda: left - right,
+                 "*": lambda: left * right, "/": lambda: left / right}[operator]()
+    except (decimal.DivisionByZero, decimal.InvalidOperation):
+        return None
+    computed = {"+": lambda: float(left) + float(right), "-": lambda: float(left) - float(right),
+                "*": lambda: float(left) * float(right), "/": lambda: float(left) / float(right)}[operator]()
+    if exact.is_zero() or (operator == "/" and exact * right != left):
+        return None
+    text = format(exact.normalize(), "f")
+    # 0.56 * 20 is 11.200000000000001 in JS, that one stays an expression
+    return text if float(text) == computed and len(text.lstrip("-").replace(".", "")) <= 15 else None
 
-# Process each entity in the JSON
-for mob in data["advance_mob"]:
-    entity_name = mob["name"]
-    entity_name_camel = to_camel_case(entity_name)
-    entity_folder = os.path.join(base_output_dir, to_camel_case(entity_name))
-    os.makedirs(entity_folder, exist_ok=True)
+def fold_code(code):
+    def fold(match):
+        left, operator, right = match.groups()
+        text = format_js_number(decimal.Decimal(left), operator, decimal.Decimal(right))
+        if text is None:
+            return match.group(0)
+        # Keep the parentheses around negative results so a - (1 - 2) stays valid
+        return f"({text})" if text.startswith("-") else text
+
+    folded = CONSTANT_EXPRESSION.sub(fold, code)
+    while folded != code:
+        code, folded = folded, CONSTANT_EXPRESSION.sub(fold, folded)
+    return folded
+
+def fold_constants(source):
+    """Replace constant expressions like (0.5 * 20) with their value, outside strings and comments."""
+    parts = []
+    position = 0
+    for match in JS_STRING_OR_COMMENT.finditer(source):
+        parts.append(fold_code(source[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(fold_code(source[position:]))
+    return "".join(parts)
+
+class TemplateRegistry:
+    """Attack templates from <template_dir>/<attack_type>.js, compiled once and rendered per attack."""
+
+    def __init__(self, template_dir):
+        self.template_dir = template_dir
+        self.compiled: Dict[str, list] = {}
+        self.hashes: Dict[str, str] = {}
+
+    def available(self):
+        if not os.path.isdir(self.template_dir):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.template_dir) if name.endswith(".js"))
+
+    def template_paths(self):
+        return [os.path.join(self.template_dir, f"{template_type}.js") for template_type in self.available()]
 
-    # Generate config.js
+    def compile(self, template_type):
+        if template_type not in self.compiled:
+            template_path = os.path.join(self.template_dir, f"{template_type}.js")
+            if not re.fullmatch(r"\w+", template_type) or not os.path.isfile(template_path):
+                raise UnknownTemplateError(
+                    f"Unknown attack_type '{template_type}', expected one of: {', '.join(self.available())}"
+                )
+            with open(template_path, "r") as template_file:
+                source = template_file.read()
+            folded = fold_constants(source)
+            # Even indices are literal text, odd indices field names
+            parts = TEMPLATE_FIELD.split(folded)
+            unknown_fields = sorted(set(parts[1::2]) - TEMPLATE_FIELDS)
+            if unknown_fields:
+                raise UnknownTemplateError(
+                    f"Template '{template_path}' uses unknown fields: {', '.join(unknown_fields)}, "
+                    f"expected some of: {', '.join(sorted(TEMPLATE_FIELDS))}"
+                )
+            # Hash what gets rendered, so changes to the folding regenerate the output too
+            self.hashes[template_type] = hashlib.sha256(folded.encode("utf-8")).hexdigest()
+            self.compiled[template_type] = parts
+        return self.compiled[template_type]
+
+    def source_hash(self, template_type):
+        self.compile(template_type)
+        return self.hashes[template_type]
+
+    def render(self, template_type, fields):
+        parts = self.compile(template_type)
+        return "".join(part if idx % 2 == 0 else str(fields[part]) for idx, part in enumerate(parts))
+
+def generate_function_template(registry, entity_name, attack_id, template_type):
+    """Generate function template for an attack based on the template type."""
+    return "\n" + registry.render(template_type, {
+        "function_name": f"{to_camel_case(entity_name)}{to_camel_case(attack_id)}",
+        "config_name": f"{to_camel_case(entity_name).upper()}_CONFIG",
+        "attack_key": attack_id.upper(),
+        "attack_id": attack_id,
+        "entity_name": entity_name,
+    })
+
+
+def generate_config_content(mob):
+    """Generate config.js for a mob."""
+    entity_name = mob["name"]
     attack_configs = ",\n".join([generate_attack_config(attack) for attack in mob["attacks"]])
-    config_content = f"""// Attack Configuration for {entity_name_camel}
+    return f"""// Attack Configuration for {to_camel_case(entity_name)}
 
 export const {to_camel_case(entity_name).upper()}_CONFIG = {{
 {attack_configs}
 }};
 """
-    # For config.js
-    config_file_path = os.path.join(entity_folder, "config.js")
-    if not os.path.exists(config_file_path):
-        with open(config_file_path, "w") as config_file:
-            config_file.write(config_content)
-    else:
-        print(f"File already exists: {config_file_path}")
-
-    # Generate handlers.js
+
+def generate_handlers_content(mob):
+    """Generate handlers.js for a mob."""
+    entity_name = mob["name"]
+    entity_name_camel = to_camel_case(entity_name)
     switch_cases = ",\n".join([generate_switch_case(entity_name_camel, attack["id"]) for attack in mob["attacks"]])
-    handlers_content = f"""// Handlers for {entity_name_camel} Attacks
+    return f"""// Handlers for {entity_name_camel} Attacks
 import {{ {", ".join([entity_name_camel + to_camel_case(attack["id"]) for attack in mob["attacks"]])} }} from './functions';
 import {{ identifier }} from '../../utils';
 
@@ -213,31 +484,361 @@ export const {to_camel_case(entity_name)} = [
     }}
 ];
 """
-    handlers_file_path = os.path.join(entity_folder, "handlers.js")
-    if not os.path.exists(handlers_file_path):
-        with open(handlers_file_path, "w") as handlers_file:
-            handlers_file.write(handlers_content)
-    else:
-        print(f"File already exists: {handlers_file_path}")
-
-    # Generate functions.js
+
+def generate_functions_content(mob, registry):
+    """Generate functions.js for a mob. Raises UnknownTemplateError."""
+    entity_name = mob["name"]
     function_templates = "\n".join(
-        generate_function_template(entity_name, attack["id"], attack.get("attack_type", "basic")) 
+        generate_function_template(registry, entity_name, attack["id"], attack.get("attack_type", "basic"))
         for attack in mob["attacks"]
     )
-    functions_content = f"""// Function Definitions for {entity_name_camel} Attacks
+    return f"""// Function Definitions for {to_camel_case(entity_name)} Attacks
 import {{ EntityDamageCause }} from "@minecraft/server";
 import * as utils from '../../utils/index';
 import {{ startCoroutineForBoss }} from "../../eventManager/CoroutineClass";
 import {{ {to_camel_case(entity_name).upper()}_CONFIG }} from "./config"; \n
 {function_templates}
 """
-    # For functions.js
-    functions_file_path = os.path.join(entity_folder, "functions.js")
-    if not os.path.exists(functions_file_path):
-        with open(functions_file_path, "w") as functions_file:
-            functions_file.write(functions_content)
-    else:
-        print(f"File already exists: {functions_file_path}")
-
-print(f"Output generated for all entities in: {base_output_dir}")
+
+# Bump when the generated output changes, so every mob is regenerated once
+MANIFEST_VERSION = 1
+
+def file_digest(file_path):
+    """Return the sha256 of a file, or None if it doesn't exist."""
+    if not os.path.isfile(file_path):
+        return None
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    """Load the generation manifest, or an empty one if it's missing, stale or unreadable."""
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "mobs": {}}
+
+def save_manifest(manifest_path, manifest):
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def mob_input_hash(mob, dispatch, registry):
+    """Hash everything a mob's output depends on: its record, its templates and the mode."""
+    attack_types = sorted({attack.get("attack_type", "basic") for attack in mob["attacks"]})
+    key = {
+        "mob": mob,
+        "templates": {attack_type: registry.source_hash(attack_type) for attack_type in attack_types},
+        "dispatch": dispatch,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def mob_output_files(mob, dispatch, registry):
+    """Map the generated file names of a mob to their content generators."""
+    files = {"config.js": generate_config_content}
+    if not dispatch:
+        files["handlers.js"] = generate_handlers_content
+    files["functions.js"] = functools.partial(generate_functions_content, registry=registry)
+    return files
+
+def create_temp_file(dir_path, prefix):
+    """Create a temp file in dir_path with normal permissions and return (fd, path)."""
+    while True:
+        temp_path = os.path.join(dir_path, f"{prefix}{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), temp_path
+        except FileExistsError:
+            continue
+
+def write_atomic(file_path, content):
+    """Write through a temp file and a rename, so readers never see a partial file."""
+    fd, temp_path = create_temp_file(os.path.dirname(file_path) or ".", ".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def emit_mob_file(file_path, content, recorded_digest):
+    """Write a generated file unless it was edited by hand; returns (status, digest to record)."""
+    current_digest = file_digest(file_path)
+    if current_digest is not None:
+        with open(file_path, "r") as f:
+            if f.read() == content:
+                return "unchanged", current_digest
+        # Files without a recorded digest predate the manifest and are adopted
+        if recorded_digest is not None and current_digest != recorded_digest:
+            return "skipped", recorded_digest
+
+    write_atomic(file_path, content)
+    return "regenerated", file_digest(file_path)
+
+class MobResult(NamedTuple):
+    entity_name: str
+    entry: Optional[dict]
+    statuses: Counter
+    messages: List[tuple]
+
+def ordered_map(function, items, workers):
+    """Map over items on a thread pool, yielding results in input order."""
+    if workers <= 1:
+        yield from map(function, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class ScriptGenerator:
+    """Renders and writes the entitySubscriptions scripts of advance_mob records."""
+
+    def __init__(self, output_dir, template_dir=TEMPLATE_DIR, dispatch=False, workers=1, manifest_path=MANIFEST_PATH):
+        self.output_dir = output_dir
+        self.registry = TemplateRegistry(template_dir)
+        # With dispatch a single dispatch.js replaces the per-entity handlers.js
+        self.dispatch = dispatch
+        # Mobs are rendered and written on a thread pool; 1 keeps everything on the calling thread
+        self.workers = max(1, int(workers))
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path)
+
+    def reload_templates(self):
+        """Drop the compiled templates, so edited template files are read again."""
+        self.registry = TemplateRegistry(self.registry.template_dir)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            get_output_dir(settings.get("short_path", "")),
+            template_dir=settings.get("template_dir", TEMPLATE_DIR),
+            dispatch=settings.get("dispatch", False),
+            workers=settings.get("workers", 1),
+            manifest_path=settings.get("manifest", MANIFEST_PATH),
+        )
+
+    def render(self, mob):
+        """Return {file name: content} for a mob. Raises UnknownTemplateError."""
+        return {
+            filename: generate_content(mob)
+            for filename, generate_content in mob_output_files(mob, self.dispatch, self.registry).items()
+        }
+
+    def write_mob(self, mob, previous_entry, incremental=False):
+        """Render and write the files of one mob, returning counters and messages for the caller."""
+        entity_name = mob["name"]
+        entity_folder = os.path.join(self.output_dir, to_camel_case(entity_name))
+        output_files = mob_output_files(mob, self.dispatch, self.registry)
+        recorded_files = previous_entry.get("files", {})
+        statuses = Counter()
+
+        try:
+            input_hash = mob_input_hash(mob, self.dispatch, self.registry)
+        except UnknownTemplateError as e:
+            statuses["template_errors"] += 1
+            return MobResult(entity_name, None, statuses, [("error", f"{entity_name}: {e}")])
+
+        # Unchanged input and untouched output: nothing to render
+        if previous_entry.get("input") == input_hash and (incremental or all(
+            file_digest(os.path.join(entity_folder, filename)) == recorded_files.get(filename)
+            for filename in output_files
+        )):
+            statuses["files_unchanged"] += len(output_files)
+            return MobResult(entity_name, previous_entry, statuses, [("debug", f"Unchanged: {entity_name}")])
+
+        os.makedirs(entity_folder, exist_ok=True)
+        files = {}
+        messages = []
+        for filename, generate_content in output_files.items():
+            file_path = os.path.join(entity_folder, filename)
+            status, digest = emit_mob_file(file_path, generate_content(mob), recorded_files.get(filename))
+            statuses[f"files_{status}"] += 1
+            if status == "skipped":
+                messages.append(("info", f"Skipping {file_path}, it was edited after generation"))
+            if digest is not None:
+                files[filename] = digest
+        # Files this mode no longer generates, like handlers.js once dispatch is on
+        for filename, recorded_digest in recorded_files.items():
+            if filename in output_files:
+                continue
+            file_path = os.path.join(entity_folder, filename)
+            current_digest = file_digest(file_path)
+            if current_digest is None:
+                continue
+            if current_digest != recorded_digest:
+                statuses["files_skipped"] += 1
+                messages.append(("info", f"Not removing {file_path}, it was edited after generation"))
+                files[filename] = recorded_digest
+                continue
+            os.remove(file_path)
+            statuses["files_removed"] += 1
+            messages.append(("info", f"Removed {file_path}, it is no longer generated"))
+        # A skipped file is still stale, so keep the old input hash to check it again next run
+        if statuses["files_skipped"]:
+            input_hash = previous_entry.get("input")
+        return MobResult(entity_name, {"input": input_hash, "files": files}, statuses, messages)
+
+    def write(self, records, incremental=False):
+        """Write the output of a stream of MobRecords, save the manifest and return the counters."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        previous_mobs = self.manifest["mobs"]
+        manifest = {"version": MANIFEST_VERSION, "mobs": {}}
+        dispatch_mobs = []
+        statuses = Counter()
+
+        def process(record):
+            if record.error is not None:
+                return record, None
+            return record, self.write_mob(record.mob, previous_mobs.get(record.mob["name"], {}), incremental)
+
+        with instrumentation.phase("emit"):
+            for record, result in ordered_map(process, records, self.workers):
+                if record.error is not None:
+                    instrumentation.error(f"{record.location}: {record.error}")
+                    statuses["record_errors"] += 1
+                    continue
+                mob = record.mob
+                statuses["mobs"] += 1
+                statuses["attacks"] += len(mob["attacks"])
+                statuses.update(result.statuses)
+                for level, message in result.messages:
+                    # Errors point at the record like record errors do
+                    getattr(instrumentation, level)(f"{record.location}: {message}" if level == "error" else message)
+                if result.entry is None:
+                    # Nothing was written, so the dispatch table can't import its handlers
+                    continue
+                manifest["mobs"][result.entity_name] = result.entry
+                dispatch_mobs.append({"name": mob["name"], "attacks": [{"id": attack["id"]} for attack in mob["attacks"]]})
+
+        # Keep the records of mobs that failed this time; their files weren't touched
+        if statuses["record_errors"] or statuses["template_errors"]:
+            for name, entry in previous_mobs.items():
+                manifest["mobs"].setdefault(name, entry)
+
+        # The dispatch table covers every entity, so it is regenerated whenever it changes
+        dispatch_file_path = os.path.join(self.output_dir, "dispatch.js")
+        recorded_dispatch = self.manifest.get("dispatch")
+        with instrumentation.phase("emit"):
+            if self.dispatch:
+                statuses[f"files_{self.write_dispatch(dispatch_mobs)}"] += 1
+                manifest["dispatch"] = file_digest(dispatch_file_path)
+            elif recorded_dispatch is not None and file_digest(dispatch_file_path) is not None:
+                # Left over from dispatch mode, its listener would fire every attack a second time
+                if file_digest(dispatch_file_path) == recorded_dispatch:
+                    os.remove(dispatch_file_path)
+                    statuses["files_removed"] += 1
+                    instrumentation.info(f"Removed {dispatch_file_path}, it is no longer generated")
+                else:
+                    statuses["files_skipped"] += 1
+                    manifest["dispatch"] = recorded_dispatch
+                    instrumentation.info(f"Not removing {dispatch_file_path}, it was edited after generation")
+
+        self.manifest = manifest
+        save_manifest(self.manifest_path, manifest)
+
+        for name, amount in statuses.items():
+            instrumentation.count(name, amount)
+        return statuses
+
+    def write_dispatch(self, mobs):
+        dispatch_content = generate_dispatch_module(mobs)
+        dispatch_file_path = os.path.join(self.output_dir, "dispatch.js")
+        existing_content = None
+        if os.path.exists(dispatch_file_path):
+            with open(dispatch_file_path, "r") as dispatch_file:
+                existing_content = dispatch_file.read()
+        if existing_content == dispatch_content:
+            return "unchanged"
+        write_atomic(dispatch_file_path, dispatch_content)
+        return "regenerated"
+
+def format_statuses(statuses):
+    return (f"regenerated={statuses['files_regenerated']}, "
+            f"unchanged={statuses['files_unchanged']}, "
+            f"removed={statuses['files_removed']}, "
+            f"skipped={statuses['files_skipped']}")
+
+def snapshot_files(file_paths):
+    """Return {path: (mtime, size)} of the files that exist."""
+    snapshot = {}
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        snapshot[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def watch(generator, data_files=DATA_FILE, interval=0.25):
+    """Poll the data files and templates, regenerating the mobs whose input changed, until interrupted."""
+    instrumentation.info(f"Watching {data_files} and {generator.registry.template_dir} for changes (Ctrl+C to stop)")
+    # Parsed records of every data file, only files whose stat changed are read again
+    data_snapshot = snapshot_files(resolve_data_files(data_files))
+    records_by_file = {file_path: list(iter_file_records(file_path)) for file_path in data_snapshot}
+    template_snapshot = snapshot_files(generator.registry.template_paths())
+    try:
+        while True:
+            time.sleep(interval)
+            current_data = snapshot_files(resolve_data_files(data_files))
+            current_templates = snapshot_files(generator.registry.template_paths())
+            if current_data == data_snapshot and current_templates == template_snapshot:
+                continue
+            started = time.perf_counter()
+            for file_path, stat in current_data.items():
+                if data_snapshot.get(file_path) != stat:
+                    records_by_file[file_path] = list(iter_file_records(file_path))
+            for file_path in set(records_by_file) - set(current_data):
+                del records_by_file[file_path]
+            if current_templates != template_snapshot:
+                generator.reload_templates()
+            data_snapshot, template_snapshot = current_data, current_templates
+
+            records = check_duplicates(record for file_path in sorted(records_by_file) for record in records_by_file[file_path])
+            statuses = generator.write(records, incremental=True)
+            instrumentation.info(f"Regenerated in {(time.perf_counter() - started) * 1000:.0f} ms ({format_statuses(statuses)})")
+    except KeyboardInterrupt:
+        instrumentation.info("Stopped watching")
+
+def main(argv):
+    # Parse configuration from command-line arguments
+    try:
+        config = json.loads(argv[1]) if len(argv) > 1 else {}
+    except json.JSONDecodeError as e:
+        instrumentation.error(f"Failed to parse command-line JSON argument. Details: {e}")
+        return 1
+    instrumentation.configure(config)
+
+    # A data file, a folder of data files or a glob
+    data_files = config.get("data_files", DATA_FILE)
+    data_file_paths = resolve_data_files(data_files)
+    if not data_file_paths:
+        instrumentation.error(f"No data files found at '{data_files}'.")
+        return 1
+
+    # Handle short_path in configuration
+    if not config.get("short_path", ""):
+        instrumentation.warning("'short_path' is not provided in the configuration. Using default path.")
+
+    generator = ScriptGenerator.from_settings(config)
+    statuses = generator.write(load_mobs(data_file_paths))
+    instrumentation.info(f"Output generated for all entities in: {generator.output_dir} ({format_statuses(statuses)})")
+    instrumentation.write_report()
+
+    if config.get("watch", False):
+        watch(generator, data_files, float(config.get("watch_interval", 0.25)))
+    return 1 if statuses["template_errors"] or statuses["record_errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
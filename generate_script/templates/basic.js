@@ -0,0 +1,26 @@
+export async function {{function_name}}(entity) {
+    const config = {{config_name}}.{{attack_key}};
+    const damage = utils.randomInt(...config.DAMAGE_RANGE);
+    utils.delayExecute(config.CAST_DURATION, () => {
+        utils.executeIfValid(entity, () => {
+        utils.resetAndReadyAbility(entity);
+        });
+    });
+    utils.resetFamilyAttack(entity, ['{{entity_name}}']);
+    utils.executeIfValid(entity, () => {
+      entity.setProperty(utils.identifier('animations'), config.ANIMATION);
+    });
+    utils.facePlayer(entity, 1);
+    utils.delayExecute(config.ATTACK_TIME, () => {
+        utils.executeIfValid(entity, () => {
+            utils.getTargets(entity, {
+                position: utils.getPosForward(entity, 2),
+                radius: config.RADIUS,
+                callback: (victim) => {
+                    victim.applyDamage(damage, { cause: EntityDamageCause.entityAttack, damagingEntity: entity })
+                    utils.normalizedKnockBack(entity.location, victim, 0.3, 2.6, 'default');
+                }
+            })
+        });
+    });
+}
@@ -0,0 +1,44 @@
+export async function {{function_name}}(entity) {
+    const config = {{config_name}}.{{attack_key}};
+    utils.tipPlayer(entity, config.TIP_DURATION, config.TIP_MESSAGE);
+    utils.facePlayer(entity, 1);
+
+    utils.resetFamilyAttack(entity, ['{{entity_name}}']);
+
+    let active = function* () {
+        utils.facePlayer(entity, 1);
+        yield 5;
+        utils.executeIfValid(entity, () => {
+            entity.setProperty(utils.identifier('animations'), config.ANIMATION);
+        });
+        utils.facePlayer(entity, (0.56 * 20));
+        yield (0.56 * 20);
+        utils.applyImpulse(entity, 1.3, 8.2, -6);
+        utils.getTargets(entity, {
+            position: utils.getPosForward(entity, 2),
+            radius: (config.RADIUS + 3),
+            target: "multiple",
+            callback: (victim) => {
+                utils.normalizedKnockBack(entity.location, victim, 0.2, 1.7, 'default');
+            }
+        })
+        utils.addEffect(entity, 'slow_falling', 3, 1);
+        yield 20;
+        while (!entity.isOnGround) {
+            utils.applyImpulse(entity, 0.5, -0.4, -0.1);
+            utils.addEffect(entity, 'slow_falling', 1, 1);
+            utils.facePlayer(entity, 1);
+            yield 5; // Pause for 5 tick before re-checking
+        };
+
+        yield (2.96 * 20);
+    }.bind(this);
+
+    startCoroutineForBoss(active, () => {
+        if (!entity.isValid()) return;
+        entity.addTag(utils.identifier('{{attack_id}}'));
+        const setCoolDown = Date.now() + 100 * config.CAST_DURATION + config.COOLDOWN;
+        utils.setAbilityCooldown(entity.id, '{{attack_id}}', setCoolDown);
+        utils.resetAndReadyAbility(entity);
+    }, entity.id);
+}
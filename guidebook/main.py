@@ -1,43 +1,177 @@
 import sys
 import os
+import functools
+import glob
+import hashlib
 import json
+import re
+import shutil
+import time
 import zipfile
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import List, Dict, NamedTuple
 from enum import Enum
 
 from reticulator import *
 
+# orjson parses considerably faster, use it when it is installed
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# How this filter has always prefixed its messages
+LOG_PREFIXES = {"debug": "", "info": "", "warning": "Warning: ", "error": "Error: "}
+
+class Instrumentation:
+    """Phase timers, counters and leveled logging, configured by the log_level and timing_report settings."""
+
+    def __init__(self, filter_name):
+        self.filter_name = filter_name
+        self.level = LOG_LEVELS["info"]
+        self.report_path = None
+        self.phases: Dict[str, float] = {}
+        self.counters = Counter()
+        self.started = time.perf_counter()
+
+    def configure(self, settings):
+        self.level = LOG_LEVELS.get(str(settings.get("log_level", "info")).lower(), LOG_LEVELS["info"])
+        report = settings.get("timing_report", False)
+        if report is True:
+            self.report_path = os.path.join("data", self.filter_name, "timing_report.json")
+        elif isinstance(report, str) and report:
+            self.report_path = report
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block; repeated phases of the same name add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def log(self, level, message):
+        if LOG_LEVELS[level] >= self.level:
+            print(LOG_PREFIXES[level] + message)
+
+    def debug(self, message):
+        self.log("debug", message)
+
+    def info(self, message):
+        self.log("info", message)
+
+    def warning(self, message):
+        self.log("warning", message)
+
+    def error(self, message):
+        self.log("error", message)
+
+    def write_report(self):
+        if not self.report_path:
+            return
+        report = {
+            "filter": self.filter_name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.info(f"Timing report written to {self.report_path}")
+
+instrumentation = Instrumentation("guidebook")
+
+# Chunk size used when streaming archive members to disk.
+EXTRACT_BUFFER_SIZE = 1 << 16
+
+def load_extract_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def file_crc32(file_path):
+    crc = 0
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(EXTRACT_BUFFER_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
 def unzip_file(file, input_path, output_path):
-    print("Current working directory:", os.getcwd())
+    """Extract the archive into output_path, skipping unchanged archives and members."""
     zip_path = os.path.join(input_path, file)
-    print(f"Attempting to unzip: {zip_path}")
-    print(f"Output directory: {output_path}")
+    manifest_path = output_path.rstrip('/\\') + ".manifest.json"
+    manifest = load_extract_manifest(manifest_path)
 
-    # Ensure the output directory exists
-    os.makedirs(output_path, exist_ok=True)
+    stat = os.stat(zip_path)
+    # A deleted output folder is extracted again even if the archive is unchanged
+    archive = manifest.get("archive", {}) if os.path.isdir(output_path) else {}
+    if archive.get("size") == stat.st_size and archive.get("mtime_ns") == stat.st_mtime_ns:
+        instrumentation.info(f"{zip_path}: unchanged, nothing to extract")
+        return
 
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        for member in zip_ref.infolist():
-            member_path = os.path.join(output_path, member.filename)
+    archive_hash = file_digest(zip_path)
+    archive_record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": archive_hash}
+    members = manifest.get("members", {})
+    if archive.get("hash") == archive_hash:
+        instrumentation.info(f"{zip_path}: unchanged, nothing to extract")
+    else:
+        os.makedirs(output_path, exist_ok=True)
+        counts = Counter()
 
-            # Check if file already exists
-            if os.path.exists(member_path):
-                print(f"File '{member.filename}' already exists. Skipping extraction.")
-                continue
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            new_members = {}
+            for member in zip_ref.infolist():
+                if member.is_dir():
+                    continue
+                member_path = os.path.join(output_path, member.filename)
+                new_members[member.filename] = {"crc": member.CRC, "size": member.file_size}
 
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(member_path), exist_ok=True)
+                if os.path.isfile(member_path):
+                    previous = members.get(member.filename)
+                    if previous is not None:
+                        up_to_date = previous == new_members[member.filename]
+                    else:
+                        # Extracted before the manifest existed, compare the file itself
+                        up_to_date = (os.path.getsize(member_path) == member.file_size
+                                      and file_crc32(member_path) == member.CRC)
+                    if up_to_date:
+                        counts["unchanged"] += 1
+                        continue
+
+                os.makedirs(os.path.dirname(member_path), exist_ok=True)
+                try:
+                    with zip_ref.open(member) as source, open(member_path, 'wb') as target:
+                        shutil.copyfileobj(source, target, EXTRACT_BUFFER_SIZE)
+                    counts["extracted"] += 1
+                    instrumentation.count("files_extracted")
+                except Exception as e:
+                    instrumentation.error(f"Failed extracting '{member.filename}': {e}")
+                    new_members.pop(member.filename)
+                    counts["failed"] += 1
+            members = new_members
+
+        summary = ", ".join(f"{name}={count}" for name, count in sorted(counts.items()))
+        instrumentation.info(f"{zip_path}: {summary or 'empty archive'}")
+        if counts["failed"]:
+            # Don't record the archive, so the failed members are retried next run
+            archive_record = {}
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({"archive": archive_record, "members": members}, f, indent=2)
 
-            # Extract the file
-            try:
-                with zip_ref.open(member) as source, open(member_path, 'wb') as target:
-                    target.write(source.read())
-                print(f"Extracted '{member.filename}'.")
-            except Exception as e:
-                print(f"Error extracting '{member.filename}': {e}")
-
-        print(f"Finished processing zip archive: {zip_path}")
-        
 def get_jsonpath(data, path, default=None):
     keys = [k for k in path.strip('/').split('/') if k]
     current = data
@@ -68,93 +202,734 @@ def format_name(name):
     else:
         return name.replace("_", " ").title()
 
-def get_json_value(asset, path, should_pop):
-    try:
-        if should_pop:
-            return asset.pop_jsonpath(path)
-        else:
-            return get_jsonpath(asset.data, path)
-    except Exception as e:
+def split_jsonpath(path):
+    return [k for k in path.strip('/').split('/') if k]
+
+class JsonPathTrieNode:
+    __slots__ = ("children", "targets")
+
+    def __init__(self):
+        self.children: Dict[str, "JsonPathTrieNode"] = {}
+        # (key, should_pop) pairs for paths ending at this node
+        self.targets: List[tuple] = []
+
+class CompiledJsonPaths:
+    """NameJsonPath lists compiled into a prefix trie, extracted in one traversal of an asset."""
+
+    def __init__(self, jsonpaths_list: List[List[NameJsonPath]]):
+        self.root = JsonPathTrieNode()
+        self.keys: List[str] = []
+        self.should_pop = False
+
+        for jsonpaths in jsonpaths_list:
+            for jp in jsonpaths:
+                segments = split_jsonpath(jp.path)
+                if not segments:
+                    continue
+                node = self.root
+                for segment in segments:
+                    node = node.children.setdefault(segment, JsonPathTrieNode())
+                node.targets.append((segments[-1], jp.should_pop))
+                if segments[-1] not in self.keys:
+                    self.keys.append(segments[-1])
+                self.should_pop = self.should_pop or jp.should_pop
+
+    def extract(self, asset):
+        """Return the values found in the asset and whether anything was popped from it."""
+        found = {}
+        popped = self._extract(self.root, asset.data, found)
+        if popped:
+            asset.dirty = True
+        return {key: found[key] for key in self.keys if key in found}, popped
+
+    def _extract(self, node, current, found):
+        popped = False
+        for segment, child in node.children.items():
+            if isinstance(current, dict):
+                value = current.get(segment)
+            elif isinstance(current, list):
+                try:
+                    segment = int(segment)
+                    value = current[segment]
+                except (ValueError, IndexError):
+                    continue
+            else:
+                return popped
+
+            if value is None:
+                continue
+            if child.children:
+                popped = self._extract(child, value, found) or popped
+
+            should_pop = False
+            for key, pop in child.targets:
+                found[key] = value
+                should_pop = should_pop or pop
+            if should_pop:
+                del current[segment]
+                popped = True
+        return popped
+
+# Bump when the layout of cached records changes.
+CACHE_VERSION = 4
+CACHE_DIR = os.path.join("data", "guidebook", "cache")
+
+class TranslationCache:
+    """Extracted asset records kept between runs, validated by mtime/size and then content hash."""
+
+    def __init__(self, cache_path, settings_key, max_entries=10000):
+        self.cache_path = cache_path
+        self.settings_key = settings_key
+        self.max_entries = max_entries
+        self.entries: Dict[str, dict] = {}
+        self.stats = Counter()
+
+    @staticmethod
+    def make_settings_key(key_list, ignored_namespaces, prefilter=False):
+        payload = json.dumps({
+            "version": CACHE_VERSION,
+            "key_list": key_list,
+            "ignored_namespaces": ignored_namespaces,
+            "prefilter": prefilter,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            instrumentation.warning(f"Ignoring unreadable translation cache '{self.cache_path}': {e}")
+            return
+
+        if cached.get("settings_key") != self.settings_key:
+            self.stats["invalidated"] = len(cached.get("entries", {}))
+            return
+        self.entries = cached.get("entries", {})
+
+    def save(self):
+        # Never evict below twice the files looked up this run, a full run must fit
+        max_entries = max(self.max_entries, 2 * (self.stats["hits"] + self.stats["misses"]))
+        # Entries are kept in LRU order, the oldest come first
+        while len(self.entries) > max_entries:
+            del self.entries[next(iter(self.entries))]
+            self.stats["evicted"] += 1
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"settings_key": self.settings_key, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def lookup(self, local_path, file_path):
+        entry = self.entries.pop(local_path, None)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        stat = os.stat(file_path)
+        if entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            with open(file_path, 'rb') as f:
+                if entry["size"] != stat.st_size or hashlib.sha1(f.read()).hexdigest() != entry["hash"]:
+                    self.stats["misses"] += 1
+                    return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+
+        # Re-insert to mark the entry as most recently used
+        self.entries[local_path] = entry
+        self.stats["hits"] += 1
+        return entry["record"]
+
+    def store(self, local_path, file_path, raw, record):
+        stat = os.stat(file_path)
+        self.entries.pop(local_path, None)
+        self.entries[local_path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": len(raw),
+            "hash": hashlib.sha1(raw).hexdigest(),
+            "record": record,
+        }
+
+    def print_stats(self):
+        summary = ", ".join(f"{name}={count}" for name, count in sorted(self.stats.items()))
+        instrumentation.info(f"Translation cache: {summary or 'empty'}")
+
+# Behavior pack folders that hold the assets the guidebook reads from.
+BP_ASSET_FOLDERS = ["entities", "blocks", "items", "recipes"]
+
+# Top-level component of an asset -> guidebook category it is indexed under.
+COMPONENT_CATEGORIES = {
+    "minecraft:entity": "entity",
+    "minecraft:block": "block",
+    "minecraft:item": "item",
+    "minecraft:recipe_shaped": "recipe",
+    "minecraft:recipe_shapeless": "recipe",
+    "minecraft:recipe_furnace": "recipe",
+    "minecraft:recipe_brewing_mix": "recipe",
+    "minecraft:recipe_brewing_container": "recipe",
+    "minecraft:recipe_smithing_transform": "recipe",
+    "minecraft:recipe_smithing_trim": "recipe",
+}
+
+CATEGORIES = ["entity", "block", "item", "recipe"]
+
+# Preference when several recipes produce the same result, best first.
+RECIPE_TYPE_ORDER = [
+    "minecraft:recipe_shaped",
+    "minecraft:recipe_shapeless",
+    "minecraft:recipe_smithing_transform",
+    "minecraft:recipe_furnace",
+    "minecraft:recipe_brewing_mix",
+    "minecraft:recipe_brewing_container",
+]
+
+class RecipeIndex(NamedTuple):
+    # Result identifier -> recipes producing it, in RECIPE_TYPE_ORDER
+    by_result: Dict[str, List[dict]]
+    # Recipe identifier, full and short -> recipe
+    by_id: Dict[str, dict]
+
+class BehaviorPackIndex(NamedTuple):
+    translations: Dict[str, Dict[str, Dict[str, str]]]
+    # Short id -> full identifier, per category
+    identifiers: Dict[str, Dict[str, str]]
+    recipes: RecipeIndex
+    counters: Dict[str, Counter]
+    # Cache hits by file path: the stripped content to write, or None if the
+    # asset is not modified by the filter
+    cached_outputs: Dict[str, str]
+
+def get_top_level_component(data):
+    if isinstance(data, dict):
+        for key in data:
+            if key in COMPONENT_CATEGORIES:
+                return key
+    return None
+
+def iter_bp_asset_files(behavior_pack):
+    """Yield every asset file of the BP once, in a stable order."""
+    for folder in BP_ASSET_FOLDERS:
+        base_directory = os.path.join(behavior_pack.input_path, folder)
+        for file_path in sorted(glob.glob(base_directory + "/**/*.json", recursive=True)):
+            yield os.path.relpath(file_path, behavior_pack.input_path)
+
+IDENTIFIER_PATTERN = re.compile(rb'"identifier"\s*:\s*"([^"]*)"')
+RECIPE_TOKEN = b'"minecraft:recipe_'
+
+class AssetPrefilter(NamedTuple):
+    """Conservative byte level checks that rule files out before they are parsed."""
+    ignored_namespaces: tuple
+    key_tokens: tuple
+
+    @staticmethod
+    def from_settings(ignored_namespaces, key_list):
+        return AssetPrefilter(
+            tuple(namespace.encode('utf-8') for namespace in ignored_namespaces),
+            tuple(f'"{key}"'.encode('utf-8') for key in key_list),
+        )
+
+    def skip_reason(self, raw):
+        # Every identifier in the file, the description one included, is ignored
+        identifiers = IDENTIFIER_PATTERN.findall(raw)
+        if identifiers and all(
+            (identifier.split(b':')[0] if b':' in identifier else b'') in self.ignored_namespaces
+            for identifier in identifiers
+        ):
+            return "ignored_namespace"
+
+        # Recipes are always indexed, other assets only matter with a key
+        if RECIPE_TOKEN not in raw and not any(token in raw for token in self.key_tokens):
+            return "no_keys"
         return None
 
-def assign_translation_value(path, value, translation_dict, key_list):
-    for key in key_list:
-        if key in path:
-            translation_dict[key] = value
-
-def process_asset(asset, jsonpaths_list, key_list):
-    translation_data = {}
-    for jsonpaths in jsonpaths_list:
-        for jp in jsonpaths:
-            value = get_json_value(asset, jp.path, jp.should_pop)
-            if value is not None:
-                assign_translation_value(jp.path, value, translation_data, key_list)
-    return translation_data
-
-def gather_translations(
-    assets: List[JsonFileResource],
-    settings: dict,
-    jsonpaths_list: List[List[NameJsonPath]],
+def parse_asset_file(file_path, prefilter: AssetPrefilter = None):
+    """Return the raw bytes, the parsed data (or None) and the prefilter skip reason of an asset file."""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    if prefilter is not None:
+        skip_reason = prefilter.skip_reason(raw)
+        if skip_reason is not None:
+            return raw, None, skip_reason
+    try:
+        return raw, json_loads(raw), None
+    except ValueError:
+        return raw, None, None
+
+def iter_parsed_asset_files(file_paths, workers=1, pool="thread", prefilter: AssetPrefilter = None):
+    """Parse the files on a thread or process pool, yielding results in input order."""
+    parse = functools.partial(parse_asset_file, prefilter=prefilter)
+    if workers <= 1 or len(file_paths) < 2:
+        yield from map(parse, file_paths)
+        return
+
+    executor_class = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+    chunksize = max(1, len(file_paths) // (workers * 4))
+    with executor_class(max_workers=workers) as executor:
+        yield from executor.map(parse, file_paths, chunksize=chunksize)
+
+def load_asset(behavior_pack, local_path, data):
+    if data is None:
+        # Let reticulator deal with comments and other non-strict JSON
+        return JsonFileResource(filepath=local_path, pack=behavior_pack)
+    return JsonFileResource(data=data, filepath=local_path, pack=behavior_pack)
+
+def serialize_asset(asset):
+    """Serialize an asset the same way reticulator writes it on save."""
+    clean_data = {k: v for k, v in asset.data.items() if v is not None}
+    return json.dumps(clean_data, indent=2, ensure_ascii=False)
+
+def get_recipe_results(body):
+    result = body.get("result", body.get("output"))
+    results = result if isinstance(result, list) else [result]
+    identifiers = []
+    for entry in results:
+        if isinstance(entry, dict):
+            entry = entry.get("item")
+        if isinstance(entry, str):
+            identifiers.append(entry)
+    return identifiers
+
+def extract_recipe(component, body):
+    """Keep the parts of a recipe the guidebook can show, in plain JSON."""
+    recipe = {"type": component, "results": get_recipe_results(body)}
+    for field in ["key", "pattern", "ingredients", "input", "reagent", "template", "base", "addition"]:
+        if field in body:
+            recipe[field] = body[field]
+    return recipe
+
+def extract_asset_record(asset, jsonpaths_by_component, ignored_namespaces):
+    """Extract what the guidebook needs from one asset as a plain JSON record."""
+    component = get_top_level_component(asset.data)
+    record = {"component": component, "identifier": None, "translation": {}, "recipe": None, "output": None}
+    if component is None:
+        return record
+
+    identifier = get_jsonpath(asset.data, f"{component}/description/identifier")
+    if not isinstance(identifier, str):
+        return record
+    record["identifier"] = identifier
+
+    namespace = identifier.split(':')[0] if ':' in identifier else ''
+    if namespace in ignored_namespaces:
+        return record
+
+    if COMPONENT_CATEGORIES[component] == "recipe" and isinstance(asset.data[component], dict):
+        record["recipe"] = extract_recipe(component, asset.data[component])
+
+    compiled_jsonpaths = jsonpaths_by_component.get(component)
+    if compiled_jsonpaths is None:
+        return record
+    record["translation"], popped = compiled_jsonpaths.extract(asset)
+
+    # Popped keys change the file, remember what it looks like afterwards
+    if popped:
+        record["output"] = serialize_asset(asset)
+    return record
+
+def index_behavior_pack(
+    behavior_pack: BehaviorPack,
+    jsonpaths_by_component: Dict[str, CompiledJsonPaths],
     ignored_namespaces: List[str],
-    key_list: List[str],
-) -> Dict[str, Dict[str, str]]:
-    all_translations: Dict[str, Dict[str, str]] = {}
-    auto_name = settings.get('auto_name', False)
+    cache: "TranslationCache" = None,
+    load_workers: int = 1,
+    load_pool: str = "thread",
+    prefilter: AssetPrefilter = None,
+) -> BehaviorPackIndex:
+    """Visit each BP asset once and fill the translation tables and the recipe index."""
+    translations = {category: {} for category in CATEGORIES}
+    identifiers = {category: {} for category in CATEGORIES}
+    recipes = RecipeIndex({}, {})
+    counters = {category: Counter() for category in CATEGORIES + ["unknown", "prefilter"]}
+    cached_outputs = {}
 
-    for asset in assets:
-        try:
-            identifier = asset.identifier
-        except AssetNotFoundError:
+    local_paths = list(iter_bp_asset_files(behavior_pack))
+    instrumentation.count("assets_scanned", len(local_paths))
+    with instrumentation.phase("load"):
+        cached_records = [
+            cache.lookup(local_path, os.path.join(behavior_pack.input_path, local_path)) if cache else None
+            for local_path in local_paths
+        ]
+    parsed_files = iter_parsed_asset_files(
+        [os.path.join(behavior_pack.input_path, local_path)
+         for local_path, record in zip(local_paths, cached_records) if record is None],
+        load_workers,
+        load_pool,
+        prefilter,
+    )
+
+    for local_path, record in zip(local_paths, cached_records):
+        file_path = os.path.join(behavior_pack.input_path, local_path)
+
+        if record is not None:
+            if record.get("prefilter") is not None:
+                counters["prefilter"][record["prefilter"]] += 1
+                continue
+            cached_outputs[file_path] = record["output"]
+        else:
+            try:
+                with instrumentation.phase("load"):
+                    raw, data, skip_reason = next(parsed_files)
+                    if skip_reason is not None:
+                        counters["prefilter"][skip_reason] += 1
+                        # Cached too, so the next run skips the file without reading it
+                        if cache:
+                            cache.store(local_path, file_path, raw, {"prefilter": skip_reason})
+                        continue
+                    asset = load_asset(behavior_pack, local_path, data)
+            except ReticulatorException as e:
+                instrumentation.warning(f"Skipping '{local_path}': {e!r}")
+                counters["unknown"]["invalid"] += 1
+                continue
+            instrumentation.count("assets_parsed")
+            with instrumentation.phase("extract"):
+                record = extract_asset_record(asset, jsonpaths_by_component, ignored_namespaces)
+            if cache:
+                cache.store(local_path, file_path, raw, record)
+
+        component = record["component"]
+        if component is None:
+            counters["unknown"]["files"] += 1
+            continue
+
+        category = COMPONENT_CATEGORIES[component]
+        counters[category]["files"] += 1
+
+        identifier = record["identifier"]
+        if identifier is None:
+            counters[category]["no_identifier"] += 1
             continue
 
         namespace = identifier.split(':')[0] if ':' in identifier else ''
         if namespace in ignored_namespaces:
+            counters[category]["ignored"] += 1
+            continue
+
+        short_id = identifier.split(':')[-1]
+        identifiers[category][short_id] = identifier
+
+        recipe = record["recipe"]
+        if recipe is not None:
+            recipe = dict(recipe, identifier=identifier)
+            recipes.by_id[identifier] = recipe
+            recipes.by_id.setdefault(short_id, recipe)
+            for result in recipe["results"]:
+                recipes.by_result.setdefault(result, []).append(recipe)
+        category_translations = translations[category]
+        if short_id not in category_translations:
+            category_translations[short_id] = {}
+
+        category_translations[short_id].update(record["translation"])
+        counters[category]["indexed"] += 1
+        if record["translation"]:
+            counters[category]["translated"] += 1
+
+    for producing in recipes.by_result.values():
+        producing.sort(key=lambda recipe: RECIPE_TYPE_ORDER.index(recipe["type"])
+                       if recipe["type"] in RECIPE_TYPE_ORDER else len(RECIPE_TYPE_ORDER))
+
+    return BehaviorPackIndex(translations, identifiers, recipes, counters, cached_outputs)
+
+def print_index_counters(counters: Dict[str, Counter]):
+    for category, counter in counters.items():
+        if not counter:
+            continue
+        summary = ", ".join(f"{name}={count}" for name, count in sorted(counter.items()))
+        if category == "prefilter":
+            instrumentation.count("assets_prefiltered", sum(counter.values()))
+            instrumentation.info(f"Skipped before parsing: {summary}")
+        else:
+            instrumentation.info(f"Indexed {category}: {summary}")
+
+def file_digest(file_path, chunk_size=1 << 16):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def create_temp_file(dir_path, prefix):
+    """Create a temp file in dir_path with normal permissions and return (fd, path)."""
+    while True:
+        tmp_path = os.path.join(dir_path, f"{prefix}{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), tmp_path
+        except FileExistsError:
             continue
 
-        short_id = identifier.split(':')[1]
-        if short_id not in all_translations:
-            all_translations[short_id] = {}
+def write_if_changed(file_path, lines):
+    """Write lines to file_path atomically, keeping the file untouched when the content is the same."""
+    dir_path = os.path.dirname(file_path) or "."
+    digest = hashlib.sha256()
+    fd, tmp_path = create_temp_file(dir_path, os.path.basename(file_path) + ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for line in lines:
+                chunk = (line + "\n").encode('utf-8')
+                digest.update(chunk)
+                f.write(chunk)
+            size = f.tell()
+
+        if (os.path.isfile(file_path)
+                and os.path.getsize(file_path) == size
+                and file_digest(file_path) == digest.hexdigest()):
+            os.remove(tmp_path)
+            return "unchanged"
+
+        os.replace(tmp_path, file_path)
+        return "written"
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_translation_file(base_path, subfolder, filename, lines):
+    file_path = os.path.join(base_path, "scripts", subfolder, filename)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    status = write_if_changed(file_path, lines)
+    instrumentation.info(f"{filename}: {status}")
+    return status
+
+def iter_translation_lines(translations_filtered, var_name, filename, compact_output):
+    if not compact_output:
+        return iter_js_object_lines(translations_filtered, var_name)
 
-        translation_info = process_asset(asset, jsonpaths_list, key_list)
-        all_translations[short_id].update(translation_info)
+    full_size = js_module_size(iter_js_object_lines(translations_filtered, var_name))
+    compact_size = js_module_size(iter_js_object_lines_compact(translations_filtered, var_name))
+    instrumentation.count("compact_bytes_saved", full_size - compact_size)
+    instrumentation.info(
+        f"{filename}: compact output is {compact_size} bytes, "
+        f"{full_size - compact_size} bytes less than the full output ({full_size})"
+    )
+    return iter_js_object_lines_compact(translations_filtered, var_name)
+
+def assign_shards(translations_filtered, identifiers, shard_by, shard_count):
+    """Map every entry to a shard, by namespace or by a stable hash of its short id."""
+    if shard_by == "namespace":
+        entry_namespaces = {
+            name: identifiers.get(name, "").split(':')[0] if ':' in identifiers.get(name, "") else ''
+            for name in translations_filtered
+        }
+        namespaces = sorted(set(entry_namespaces.values()))
+        return {name: namespaces.index(namespace) for name, namespace in entry_namespaces.items()}, len(namespaces)
+
+    shard_count = max(1, shard_count)
+    return {name: zlib.crc32(name.encode('utf-8')) % shard_count for name in translations_filtered}, shard_count
+
+def iter_shard_index_lines(shard_of, shard_files, var_name):
+    loader_name = "load" + var_name[0].upper() + var_name[1:]
+    yield f"// Shard index for {var_name}, import only the shard an entry lives in"
+    yield f"export const {var_name}Shards = {{"
+    for idx, (name, shard) in enumerate(shard_of.items()):
+        yield f"  {name}: {shard}" + ("," if idx < len(shard_of) - 1 else "")
+    yield "};"
+    yield "const shardLoaders = ["
+    for idx, shard_file in enumerate(shard_files):
+        yield f"  () => import(\"./{shard_file}\")" + ("," if idx < len(shard_files) - 1 else "")
+    yield "];"
+    yield f"export function {loader_name}(id) {{"
+    yield f"  const shard = {var_name}Shards[id];"
+    yield "  if (shard === undefined) return Promise.resolve(undefined);"
+    yield f"  return shardLoaders[shard]().then((module) => module.{var_name}[id]);"
+    yield "}"
+
+def save_sharded_translation_files(base_path, subfolder, filename, translations_filtered, identifiers, var_name, settings):
+    """Write one category as shard modules plus an index module with lazy loaders."""
+    compact_output = settings.get("compact_output", False)
+    shard_count = settings.get("shard_count", 0)
+    if not shard_count and settings.get("shard_target_size"):
+        # Measure the format that gets written
+        iter_lines = iter_js_object_lines_compact if compact_output else iter_js_object_lines
+        output_size = js_module_size(iter_lines(translations_filtered, var_name))
+        shard_count = -(-output_size // settings["shard_target_size"])
+    shard_of, shard_count = assign_shards(translations_filtered, identifiers, settings.get("shard_by", "hash"), shard_count)
+
+    stem = filename[:-len(".js")]
+    shard_files = [f"{stem}/shard_{idx}.js" for idx in range(shard_count)]
+    statuses = []
+    for idx, shard_file in enumerate(shard_files):
+        shard_translations = {name: props for name, props in translations_filtered.items() if shard_of[name] == idx}
+        lines = iter_translation_lines(shard_translations, var_name, shard_file, compact_output)
+        statuses.append(save_translation_file(base_path, subfolder, shard_file, lines))
 
-    return all_translations
+    # Drop shards left over from a run with a higher shard count
+    for stale_path in glob.glob(os.path.join(base_path, "scripts", subfolder, stem, "shard_*.js")):
+        if os.path.relpath(stale_path, os.path.join(base_path, "scripts", subfolder)).replace(os.sep, "/") not in shard_files:
+            os.remove(stale_path)
+
+    index_lines = iter_shard_index_lines(shard_of, shard_files, var_name)
+    statuses.append(save_translation_file(base_path, subfolder, f"{stem}_index.js", index_lines))
+    return statuses
+
+def save_modified_files(project, cached_outputs):
+    """Write back only the pack files the filter changed."""
+    counts = Counter()
+    for pack in project.get_packs():
+        for resource in pack.resources:
+            if resource.dirty:
+                resource.save()
+                counts["written"] += 1
+            else:
+                counts["skipped"] += 1
+
+    for file_path, output in cached_outputs.items():
+        if output is None:
+            counts["skipped"] += 1
+            continue
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(output)
+        counts["written"] += 1
 
-def save_translation_file(base_path, subfolder, filename, content):
-    dir_path = os.path.join(base_path, "scripts", subfolder)
-    os.makedirs(dir_path, exist_ok=True)
-    file_path = os.path.join(dir_path, filename)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content + "\n")
+    instrumentation.count("pack_files_written", counts["written"])
+    instrumentation.count("pack_files_skipped", counts["skipped"])
+    instrumentation.info(f"Pack files: written={counts['written']}, skipped={counts['skipped']}")
+    return counts
 
 def filter_entries_with_props(translations):
     return {k: v for k, v in translations.items() if v}
 
-def generate_js_object_str(translations_filtered, var_name):
-    lines = []
-    lines.append(f"export const {var_name} = {{")
+def iter_js_object_lines(translations_filtered, var_name):
+    yield f"export const {var_name} = {{"
     for idx, (name, props) in enumerate(translations_filtered.items()):
-        lines.append(f"  {name}: {{")
+        yield f"  {name}: {{"
         prop_items = list(props.items())
 
         for p_idx, (prop_key, prop_value) in enumerate(prop_items):
-            if prop_key in ['recipe', 'pattern']:
+            comma = "," if p_idx < len(prop_items) - 1 else ""
+            if isinstance(prop_value, (dict, list)) or prop_key in ['recipe', 'pattern']:
                 val_str = json.dumps(prop_value)
-                lines.append(f"    {prop_key}: {val_str}" + ("," if p_idx < len(prop_items) - 1 else ""))
+                yield f"    {prop_key}: {val_str}{comma}"
+            else:
+                val_str = str(prop_value).replace('"', '\\"')
+                yield f"    {prop_key}: \"{val_str}\"{comma}"
+        comma = "," if idx < len(translations_filtered) - 1 else ""
+        yield f"  }}{comma}"
+    yield "};"
+
+# Strings shorter than this are cheaper inline than as a table reference.
+MIN_INTERNED_STRING_LENGTH = 8
+
+def iter_prop_values(translations_filtered):
+    for props in translations_filtered.values():
+        for prop_key, prop_value in props.items():
+            if isinstance(prop_value, (dict, list)) or prop_key in ['recipe', 'pattern']:
+                yield prop_value
+            else:
+                yield str(prop_value)
+
+def count_strings(value, counts):
+    if isinstance(value, str):
+        counts[value] += 1
+    elif isinstance(value, dict):
+        for item in value.values():
+            count_strings(item, counts)
+    elif isinstance(value, list):
+        for item in value:
+            count_strings(item, counts)
+
+def iter_js_object_lines_compact(translations_filtered, var_name):
+    """Same module as iter_js_object_lines, with repeated values emitted once in shared tables."""
+    object_counts = Counter()
+    string_counts = Counter()
+    for value in iter_prop_values(translations_filtered):
+        if isinstance(value, (dict, list)):
+            object_counts[json.dumps(value)] += 1
+        count_strings(value, string_counts)
+
+    strings = [
+        string for string, count in string_counts.items()
+        if count > 1 and len(string) >= MIN_INTERNED_STRING_LENGTH
+    ]
+    string_refs = {string: f"_s[{idx}]" for idx, string in enumerate(strings)}
+
+    def to_js(value):
+        if isinstance(value, str):
+            return string_refs.get(value) or json.dumps(value, ensure_ascii=False)
+        if isinstance(value, dict):
+            return "{" + ", ".join(f"{json.dumps(k, ensure_ascii=False)}: {to_js(v)}" for k, v in value.items()) + "}"
+        if isinstance(value, list):
+            return "[" + ", ".join(to_js(v) for v in value) + "]"
+        return json.dumps(value)
+
+    shared_objects = [json.loads(key) for key, count in object_counts.items() if count > 1]
+    object_refs = {json.dumps(value): f"_o[{idx}]" for idx, value in enumerate(shared_objects)}
+
+    if strings or shared_objects:
+        yield "// Shared strings and objects, referenced by index below"
+    if strings:
+        yield "const _s = ["
+        for idx, string in enumerate(strings):
+            yield f"  {json.dumps(string, ensure_ascii=False)}" + ("," if idx < len(strings) - 1 else "")
+        yield "];"
+    if shared_objects:
+        yield "const _o = ["
+        for idx, value in enumerate(shared_objects):
+            yield f"  {to_js(value)}" + ("," if idx < len(shared_objects) - 1 else "")
+        yield "];"
+
+    yield f"export const {var_name} = {{"
+    for idx, (name, props) in enumerate(translations_filtered.items()):
+        yield f"  {name}: {{"
+        prop_items = list(props.items())
+
+        for p_idx, (prop_key, prop_value) in enumerate(prop_items):
+            comma = "," if p_idx < len(prop_items) - 1 else ""
+            if isinstance(prop_value, (dict, list)):
+                val_str = object_refs.get(json.dumps(prop_value)) or to_js(prop_value)
+            elif prop_key in ['recipe', 'pattern']:
+                val_str = to_js(prop_value)
             else:
-                if isinstance(prop_value, dict):
-                    val_str = json.dumps(prop_value)
-                    lines.append(f"    {prop_key}: {val_str}" + ("," if p_idx < len(prop_items) - 1 else ""))
-                elif isinstance(prop_value, list):
-                    val_str = json.dumps(prop_value)
-                    lines.append(f"    {prop_key}: {val_str}" + ("," if p_idx < len(prop_items) - 1 else ""))
-                else:
-                    val_str = str(prop_value).replace('"', '\\"')
-                    lines.append(f"    {prop_key}: \"{val_str}\"" + ("," if p_idx < len(prop_items) - 1 else ""))
+                val_str = to_js(str(prop_value))
+            yield f"    {prop_key}: {val_str}{comma}"
         comma = "," if idx < len(translations_filtered) - 1 else ""
-        lines.append(f"  }}{comma}")
-    lines.append("};")
-    return "\n".join(lines)
+        yield f"  }}{comma}"
+    yield "};"
+
+class SearchIndexBuilder:
+    """Builds search_index.js: sorted names, a prefix index into them and the ids of every category."""
+
+    def __init__(self, prefix_length=3):
+        self.prefix_length = prefix_length
+        self.entries: List[tuple] = []
+        self.category_ids: Dict[str, List[str]] = {}
+
+    def add_category(self, category, translations_filtered, identifiers):
+        self.category_ids[category] = sorted(translations_filtered)
+        for name in translations_filtered:
+            self.entries.append((format_name(identifiers.get(name, name)), category, name))
+
+    def iter_js_lines(self):
+        entries = sorted(self.entries, key=lambda entry: (entry[0].lower(), entry[1], entry[2]))
+
+        prefixes: Dict[str, List[int]] = {}
+        for idx, (formatted, _, _) in enumerate(entries):
+            lowered = formatted.lower()
+            for length in range(1, min(self.prefix_length, len(lowered)) + 1):
+                prefix_range = prefixes.setdefault(lowered[:length], [idx, idx])
+                prefix_range[1] = idx + 1
+
+        yield "// Search index for the guidebook, generated alongside the translations"
+        yield "// [formatted name, category, id], sorted by lowercase name"
+        yield "export const searchEntries = ["
+        for idx, entry in enumerate(entries):
+            yield f"  {json.dumps(list(entry), ensure_ascii=False)}" + ("," if idx < len(entries) - 1 else "")
+        yield "];"
+        yield f"// Lowercase prefix (up to {self.prefix_length} characters) -> [start, end) in searchEntries"
+        yield f"export const searchPrefixes = {json.dumps(prefixes, ensure_ascii=False)};"
+        yield f"export const categoryIds = {json.dumps(self.category_ids, ensure_ascii=False)};"
+        yield "export function findByPrefix(prefix) {"
+        yield "  const lowered = prefix.toLowerCase();"
+        yield "  if (!lowered) return searchEntries;"
+        yield f"  const range = searchPrefixes[lowered.slice(0, {self.prefix_length})];"
+        yield "  if (!range) return [];"
+        yield "  const matches = searchEntries.slice(range[0], range[1]);"
+        yield f"  if (lowered.length <= {self.prefix_length}) return matches;"
+        yield "  return matches.filter((entry) => entry[0].toLowerCase().startsWith(lowered));"
+        yield "}"
+
+def js_module_size(lines):
+    return sum(len(line.encode('utf-8')) + 1 for line in lines)
 
 def map_pattern_grid(patterns):
     slot_mapping = {}
@@ -171,13 +946,66 @@ def map_pattern_grid(patterns):
             
     return slot_mapping
 
+def as_key_entry(ingredient):
+    return {"item": ingredient} if isinstance(ingredient, str) else ingredient
+
+def build_recipe_guide(recipe):
+    """Turn a recipe into the 'recipe' and 'pattern' pair the guidebook shows."""
+    if recipe["type"] == "minecraft:recipe_shaped":
+        key_value = recipe.get("key")
+        # Parse key if JSON string
+        if isinstance(key_value, str):
+            try:
+                key_value = json.loads(key_value)
+            except json.JSONDecodeError:
+                instrumentation.warning(f"Failed to parse JSON for recipe ID '{recipe['identifier']}'")
+        return {"recipe": key_value, "pattern": map_pattern_grid(recipe.get("pattern") or [])}
+
+    if "ingredients" in recipe:
+        ingredients = recipe["ingredients"]
+    else:
+        ingredients = [recipe[field] for field in ["input", "reagent", "template", "base", "addition"] if field in recipe]
+
+    key_value = {}
+    pattern = {}
+    for idx, ingredient in enumerate(ingredients[:9]):
+        letter = chr(ord("A") + idx)
+        key_value[letter] = as_key_entry(ingredient)
+        pattern[f"slot_{idx + 1}"] = letter
+    return {"recipe": key_value, "pattern": pattern}
+
+def associate_recipes(translations_filtered, identifiers, recipes: RecipeIndex, guides: Dict[str, dict]):
+    """Attach to every entry its explicit recipe, or the best recipe producing it."""
+    for name, entry in translations_filtered.items():
+        recipe_id = entry.get('recipe')
+        recipe = None
+        if isinstance(recipe_id, str):
+            recipe = recipes.by_id.get(recipe_id)
+            if recipe is None:
+                instrumentation.warning(f"{name}: recipe ID '{recipe_id}' not in recipe index")
+        if recipe is None:
+            producing = recipes.by_result.get(identifiers.get(name))
+            if not producing:
+                continue
+            recipe = producing[0]
+
+        guide = guides.get(recipe["identifier"])
+        if guide is None:
+            guide = guides[recipe["identifier"]] = build_recipe_guide(recipe)
+
+        instrumentation.debug(f"Before assignment: {entry}")
+        entry['recipe'] = guide["recipe"]
+        entry['pattern'] = guide["pattern"]
+        instrumentation.debug(f"After assignment: {entry}")
+
 def main():
     # Load settings
     try:
         settings = json.loads(sys.argv[1])
     except IndexError:
-        #print("Warning: No settings provided. Using default settings.")
         settings = {}
+    instrumentation.configure(settings)
+    instrumentation.debug(f"Settings: {settings}")
 
     ignored_namespaces = settings.get("ignored_namespaces", ['minecraft'])
 
@@ -189,146 +1017,94 @@ def main():
 
     key_list = settings.get("key_list", [])
 
-    # For entities
-    entity_jsonpaths = []
-    for key in key_list:
-        path = f"minecraft:entity/description/{key}"
-        entity_jsonpaths.append(NameJsonPath(path, True, False))
-    entity_jsonpaths_list = [entity_jsonpaths]
-
-    # For blocks
-    block_jsonpaths = []
-    for key in key_list:
-        path = f"minecraft:block/description/{key}"
-        block_jsonpaths.append(NameJsonPath(path, True, False))
-    block_jsonpaths_list = [block_jsonpaths]
-
-    # For recipes
-    recipe_jsonpaths = []
-    for key in key_list:
-        path = f"minecraft:recipe_shaped/{key}"
-        recipe_jsonpaths.append(NameJsonPath(path, False, False))
-    recipe_jsonpaths_list = [recipe_jsonpaths]
-
-    # For items
-    item_jsonpaths = []
-    for key in key_list:
-        path = f"minecraft:item/description/{key}"
-        item_jsonpaths.append(NameJsonPath(path, True, False))
-    item_jsonpaths_list = [item_jsonpaths]
-
-    # Gather entity translations
-    entity_translations = gather_translations(
-        behavior_pack.entities,
-        settings.get("entity", {}),
-        entity_jsonpaths_list,
-        ignored_namespaces,
-        key_list
-    )
+    jsonpaths_by_component = {
+        "minecraft:entity": [[NameJsonPath(f"minecraft:entity/description/{key}", True, False) for key in key_list]],
+        "minecraft:block": [[NameJsonPath(f"minecraft:block/description/{key}", True, False) for key in key_list]],
+        "minecraft:item": [[NameJsonPath(f"minecraft:item/description/{key}", True, False) for key in key_list]],
+        "minecraft:recipe_shaped": [[NameJsonPath(f"minecraft:recipe_shaped/{key}", False, False) for key in key_list]],
+    }
+    compiled_jsonpaths = {
+        component: CompiledJsonPaths(jsonpaths_list)
+        for component, jsonpaths_list in jsonpaths_by_component.items()
+    }
 
-    # Gather block translations
-    block_translations = gather_translations(
-        behavior_pack.blocks,
-        settings.get("blocks", {}),
-        block_jsonpaths_list,
-        ignored_namespaces,
-        key_list
-    )
+    cache = None
+    if settings.get("use_cache", True):
+        cache = TranslationCache(
+            os.path.join(CACHE_DIR, "translations.json"),
+            TranslationCache.make_settings_key(key_list, ignored_namespaces, settings.get("prefilter", True)),
+            settings.get("cache_max_entries", 10000),
+        )
+        cache.load()
 
-    # Gather recipe translations
-    recipe_translations = gather_translations(
-        behavior_pack.recipes,
-        settings.get("recipes", {}),
-        recipe_jsonpaths_list,
+    # Gather all translations in a single pass over the behavior pack
+    index = index_behavior_pack(
+        behavior_pack,
+        compiled_jsonpaths,
         ignored_namespaces,
-        key_list
-    )
-
-    # Gather item translations
-    item_translations = gather_translations(
-        behavior_pack.items,
-        settings.get("items", {}),
-        item_jsonpaths_list,
-        ignored_namespaces,
-        key_list
+        cache,
+        settings.get("load_workers", 1),
+        settings.get("load_pool", "thread"),
+        AssetPrefilter.from_settings(ignored_namespaces, key_list) if settings.get("prefilter", True) else None,
     )
+    print_index_counters(index.counters)
+    if cache:
+        cache.save()
+        cache.print_stats()
+        instrumentation.count("cache_hits", cache.stats["hits"])
 
     # Filter entries
-    recipe_translations_filtered = filter_entries_with_props(recipe_translations)
-    entity_translations_filtered = filter_entries_with_props(entity_translations)
-    block_translations_filtered = filter_entries_with_props(block_translations)
-    item_translations_filtered = filter_entries_with_props(item_translations)
-
-    # --- Build recipe_lookup from recipe assets ---
-    recipe_lookup = {}
-    for recipe_asset in behavior_pack.recipes:
-        recipe_id = recipe_asset.identifier  # e.g., 'minecraft:some_recipe'
-        recipe_data = recipe_asset.data
-        if isinstance(recipe_data, dict) and 'key' in recipe_data:
-            recipe_lookup[recipe_id] = recipe_data['key']
-
-    def associate_recipe_with_translations(recipe_translations_filtered, filtered_translations_dict, name_key='name'):
-        for item_name, item_data in filtered_translations_dict.items():
-            recipe_id = item_data.get('recipe')
-            if not recipe_id:
-                continue  # No recipe property; skip
-            if recipe_id not in recipe_translations_filtered:
-                print(f"{item_name}: recipe ID '{recipe_id}' not in recipeTranslations")
-                continue
-            recipe_data = recipe_translations_filtered[recipe_id]
-            key_value = recipe_data.get('key', None)
-            pattern = recipe_data.get('pattern', None)
-            print(f"Before assignment: {filtered_translations_dict[item_name]}")
-
-            # Parse key if JSON string
-            if isinstance(key_value, str):
-                try:
-                    recipe_obj = json.loads(key_value)
-                except json.JSONDecodeError:
-                    print(f"Failed to parse JSON for recipe ID '{recipe_id}'")
-                    recipe_obj = key_value
-            else:
-                recipe_obj = key_value
+    entity_translations_filtered = filter_entries_with_props(index.translations["entity"])
+    block_translations_filtered = filter_entries_with_props(index.translations["block"])
+    item_translations_filtered = filter_entries_with_props(index.translations["item"])
 
-            # Assign recipe object and pattern
-            filtered_translations_dict[item_name]['recipe'] = recipe_obj
-            filtered_translations_dict[item_name]['pattern'] = map_pattern_grid(pattern)
+    # Join every category with the recipe index, sharing the built guides
+    guides = {}
+    with instrumentation.phase("join"):
+        associate_recipes(block_translations_filtered, index.identifiers["block"], index.recipes, guides)
+        associate_recipes(item_translations_filtered, index.identifiers["item"], index.recipes, guides)
+        associate_recipes(entity_translations_filtered, index.identifiers["entity"], index.recipes, guides)
 
-            print(f"After assignment: {filtered_translations_dict[item_name]}")
-
-    # Apply for blocks
-    associate_recipe_with_translations(
-        recipe_translations_filtered, block_translations_filtered, 'block'
-    )
-
-    # Apply for items
-    associate_recipe_with_translations(
-        recipe_translations_filtered, item_translations_filtered, 'item'
-    )
-
-    # Apply for entities
-    associate_recipe_with_translations(
-        recipe_translations_filtered, entity_translations_filtered, 'entity'
-    )
-
-    # Generate JS strings
-    entity_object_str = generate_js_object_str(entity_translations_filtered, "blockTranslations")
-    block_object_str = generate_js_object_str(block_translations_filtered, "blockTranslations")
-    item_object_str = generate_js_object_str(item_translations_filtered, "itemTranslations")
-
-    # Save files
+    # Stream the JS objects to their files, leaving unchanged files untouched
     short_path = settings.get('short_path', '')
     base_path = '../../packs'
 
-    save_translation_file(base_path, short_path, "entity_translations.js", entity_object_str)
-    save_translation_file(base_path, short_path, "block_translations.js", block_object_str)
-    save_translation_file(base_path, short_path, "item_translations.js", item_object_str)
+    sharded = bool(settings.get("shard_count") or settings.get("shard_target_size") or settings.get("shard_by"))
+    search_index = SearchIndexBuilder(settings.get("search_prefix_length", 3)) if settings.get("search_index", True) else None
+    write_stats = Counter()
+    for category, filename, translations_filtered, var_name in [
+        ("entity", "entity_translations.js", entity_translations_filtered, "blockTranslations"),
+        ("block", "block_translations.js", block_translations_filtered, "blockTranslations"),
+        ("item", "item_translations.js", item_translations_filtered, "itemTranslations"),
+    ]:
+        identifiers = index.identifiers[category]
+        with instrumentation.phase("emit"):
+            if search_index:
+                search_index.add_category(category, translations_filtered, identifiers)
+            if sharded:
+                write_stats.update(save_sharded_translation_files(
+                    base_path, short_path, filename, translations_filtered, identifiers, var_name, settings
+                ))
+            else:
+                lines = iter_translation_lines(translations_filtered, var_name, filename, settings.get("compact_output", False))
+                write_stats[save_translation_file(base_path, short_path, filename, lines)] += 1
+    if search_index:
+        with instrumentation.phase("emit"):
+            write_stats[save_translation_file(base_path, short_path, "search_index.js", search_index.iter_js_lines())] += 1
+    instrumentation.count("translation_files_written", write_stats["written"])
+    instrumentation.count("translation_files_unchanged", write_stats["unchanged"])
+    instrumentation.info(f"Translation files: written={write_stats['written']}, unchanged={write_stats['unchanged']}")
+
     file = 'guidebook.zip'
     output_path = os.path.join(base_path, 'scripts', '5fs', 'apt')
-    unzip_file(file, '../cache/filters/guidebook', output_path)
+    with instrumentation.phase("unzip"):
+        unzip_file(file, '../cache/filters/guidebook', output_path)
+
+    # Save only the files that were modified
+    with instrumentation.phase("save"):
+        save_modified_files(project, index.cached_outputs)
 
-    # Save project
-    project.save()
+    instrumentation.write_report()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file